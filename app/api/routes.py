@@ -1,159 +1,299 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, BackgroundTasks
-from typing import List, Optional
-from app.utils.file_utils import validate_file, get_temp_file_path
-import os
-import uuid
-import shutil
+from fastapi import APIRouter, HTTPException, UploadFile, File, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Any, AsyncIterator, List, Optional, Tuple
+import orjson
 import time
+from pydantic import ValidationError
 from app.api.schemas import (
     ExtractionResponse, 
     BatchExtractionResponse,
-    HealthResponse
+    HealthResponse,
+    CandidateDetails,
+    SubjectMarks,
+    OverallResult,
+    IssueDetails
 )
 from app.services.extractor import MarksheetExtractor
+from app.services.cache import extraction_cache
+from app.services.batching import AsyncBatchQueue
+from app.services.pipeline import iter_pipeline
 from app.core.config import settings
-from app.core.exceptions import MarksheetExtractionException
-from app.utils.file_utils import validate_file, get_temp_file_path
+from app.utils.file_utils import (
+    validate_file,
+    validate_file_signature,
+    temp_upload_file,
+    write_upload_file,
+    read_upload_file
+)
 import logging
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+def get_extractor(request: Request) -> MarksheetExtractor:
+    """
+    Get the shared extractor created in the app lifespan, creating it on
+    first use if startup initialization didn't happen
+    """
+    extractor = getattr(request.app.state, "extractor", None)
+    if extractor is None:
+        extractor = MarksheetExtractor()
+        request.app.state.extractor = extractor
+    return extractor
+
+def get_extraction_queue(request: Request) -> Optional[AsyncBatchQueue]:
+    """
+    Get the micro-batching queue started in the app lifespan, if any
+    """
+    return getattr(request.app.state, "extraction_queue", None)
+
+async def _lookup_cached(
+    extractor: MarksheetExtractor,
+    data: bytes,
+    start_time: float
+) -> Tuple[Optional[str], Optional[ExtractionResponse]]:
+    """
+    Look up a previous extraction of identical bytes when the extraction
+    cache is enabled
+    
+    Returns:
+        Tuple: Cache key (None when caching is disabled) and the cached response, if any
+    """
+    if not extraction_cache.enabled:
+        return None, None
+    
+    cache_key = extraction_cache.make_key(data, extractor.llm_service.version)
+    cached = await extraction_cache.get(cache_key)
+    if cached is None:
+        return cache_key, None
+    
+    logger.info("Extraction cache hit: %s", cache_key)
+    result = ExtractionResponse.model_validate(cached)
+    result.processing_time = time.time() - start_time
+    return cache_key, result
+
+async def _build_response(
+    result_dict: dict,
+    start_time: float,
+    content_type: str,
+    file_size: int,
+    cache_key: Optional[str],
+    validate: bool = False
+) -> ExtractionResponse:
+    """
+    Wrap an extraction result in the API response, caching it if enabled
+    
+    Args:
+        validate: Validate the response even when it isn't cached; set by
+            callers that don't return it through a route's response_model
+    """
+    # Create response with additional metadata. A result that is cached or
+    # streamed never passes through a response_model, so it is validated
+    # here; otherwise FastAPI validates it against the route's
+    # response_model on the way out and constructor validation is skipped
+    if validate or cache_key is not None:
+        result = ExtractionResponse.model_validate({
+            "candidate_details": result_dict["candidate_details"],
+            "subjects": result_dict["subjects"],
+            "overall_result": result_dict["overall_result"],
+            "issue_details": result_dict["issue_details"],
+            "processing_time": time.time() - start_time,
+            "file_type": content_type,
+            "file_size": file_size
+        })
+    else:
+        result = ExtractionResponse.model_construct(
+            candidate_details=CandidateDetails.model_construct(**result_dict["candidate_details"]),
+            subjects=[SubjectMarks.model_construct(**subject) for subject in result_dict["subjects"]],
+            overall_result=OverallResult.model_construct(**result_dict["overall_result"]),
+            issue_details=IssueDetails.model_construct(**result_dict["issue_details"]),
+            processing_time=time.time() - start_time,
+            file_type=content_type,
+            file_size=file_size
+        )
+    
+    if cache_key is not None:
+        await extraction_cache.set(cache_key, result.model_dump())
+    
+    return result
+
+async def _extract_upload(
+    extractor: MarksheetExtractor,
+    data: bytes,
+    content_type: str,
+    queue: Optional[AsyncBatchQueue] = None
+) -> ExtractionResponse:
+    """
+    Extract a marksheet from uploaded bytes, reusing a cached result for
+    identical files when the extraction cache is enabled
+    """
+    start_time = time.time()
+    
+    cache_key, cached = await _lookup_cached(extractor, data, start_time)
+    if cached is not None:
+        return cached
+    
+    if queue is not None:
+        result_dict = await extractor.extract_bytes_batched(data, content_type, queue)
+    else:
+        result_dict = await extractor.extract_bytes(data, content_type)
+    
+    return await _build_response(result_dict, start_time, content_type, len(data), cache_key)
 
 @router.post("/extract", response_model=ExtractionResponse)
 async def extract_marksheet(
-    background_tasks: BackgroundTasks,
+    request: Request,
     file: UploadFile = File(...)
 ):
     """
     Extract structured data from a single marksheet (JPG/PNG/PDF)
     """
-    try:
-        logger.info(f"Received file upload request: {file.filename}")
-        logger.info(f"File content type: {file.content_type}")
-        logger.info(f"File size: {file.size}")
-        
-        # Validate file
-        validate_file(file)
-        
-        # Create temporary file
-        temp_file_path = get_temp_file_path(file.filename)
-        logger.info(f"Created temporary file: {temp_file_path}")
-        
-        # Save uploaded file to temp location
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        logger.info(f"Saved file to temporary location")
-        
-        # Extract data
-        extractor = MarksheetExtractor()
-        start_time = time.time()
-        result_dict = await extractor.extract(temp_file_path)
-        processing_time = time.time() - start_time
-        
-        logger.info(f"Extraction completed in {processing_time:.2f} seconds")
-        
-        # Schedule cleanup
-        background_tasks.add_task(os.remove, temp_file_path)
-        logger.info("Scheduled file cleanup")
-        
-        # Create response with additional metadata
-        result = ExtractionResponse(
-            candidate_details=result_dict["candidate_details"],
-            subjects=result_dict["subjects"],
-            overall_result=result_dict["overall_result"],
-            issue_details=result_dict["issue_details"],
-            processing_time=processing_time,
-            file_type=file.content_type,
-            file_size=file.size
+    logger.info(
+        "Received file upload request: %s (content type: %s, size: %s)",
+        file.filename, file.content_type, file.size
+    )
+    
+    # Validate file
+    validate_file(file)
+    await validate_file_signature(file)
+    
+    # Read the upload into memory; the OCR stack works on bytes directly
+    data = await read_upload_file(file)
+    logger.info("Read %d bytes from upload", len(data))
+    
+    # Extract data
+    extractor = get_extractor(request)
+    result = await _extract_upload(
+        extractor, data, file.content_type, get_extraction_queue(request)
+    )
+    
+    logger.info("Extraction completed in %.2f seconds", result.processing_time)
+    return result
+
+def _check_batch_size(files: List[UploadFile]) -> None:
+    if len(files) > settings.MAX_BATCH_SIZE:
+        logger.error("Batch size %d exceeds maximum limit of %d", len(files), settings.MAX_BATCH_SIZE)
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Batch size exceeds maximum limit of {settings.MAX_BATCH_SIZE}"
         )
-        
-        logger.info("Returning extraction response")
-        return result
-        
-    except MarksheetExtractionException as e:
-        logger.error(f"Marksheet extraction error: {str(e)}")
-        raise HTTPException(status_code=e.status_code, detail=e.detail)
-    except Exception as e:
-        logger.error(f"Unexpected error during extraction: {str(e)}")
-        logger.error(f"Full traceback: {traceback.format_exc()}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def _batch_error(file: UploadFile, error: Exception) -> dict:
+    logger.error("Error processing %s: %s", file.filename, error)
+    return {
+        "error": f"Error processing {file.filename}: {str(error)}",
+        "filename": file.filename
+    }
+
+def _iter_batch(
+    request: Request,
+    files: List[UploadFile],
+    validate: bool = False
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Run a batch of uploads through the load -> OCR -> LLM pipeline
+    
+    Args:
+        validate: Validate every response; set when they won't pass through a response_model
+    
+    Returns:
+        AsyncIterator: (index, response or exception) pairs in completion order
+    """
+    start_time = time.time()
+    extractor = get_extractor(request)
+    
+    # Stage A: validate and read each upload, checking the extraction cache
+    async def _load(file: UploadFile) -> Tuple[UploadFile, bytes, Optional[str], Optional[ExtractionResponse]]:
+        logger.info("Processing file: %s", file.filename)
+        validate_file(file)
+        await validate_file_signature(file)
+        data = await read_upload_file(file)
+        cache_key, cached = await _lookup_cached(extractor, data, start_time)
+        return file, data, cache_key, cached
+    
+    async def _lookup(loaded) -> Optional[ExtractionResponse]:
+        return loaded[3]
+    
+    # Stage B: OCR runs off the event loop so it overlaps with LLM calls
+    async def _ocr(loaded):
+        file, data, _, _ = loaded
+        ocr_result = await extractor.ocr_service.extract_text_from_bytes(data, file.content_type)
+        return loaded, ocr_result
+    
+    # Stage C: one LLM call for each batch of OCR results
+    async def _llm_batch(entries):
+        extracted = await extractor.extract_from_ocr_batch([ocr_result for _, ocr_result in entries])
+        responses = []
+        for ((file, data, cache_key, _), _), result_dict in zip(entries, extracted):
+            if isinstance(result_dict, Exception):
+                responses.append(result_dict)
+                continue
+            try:
+                responses.append(await _build_response(
+                    result_dict, start_time, file.content_type, len(data), cache_key, validate
+                ))
+            except ValidationError as e:
+                # Only this file's result is malformed; the rest of the batch stands
+                responses.append(e)
+        return responses
+    
+    return iter_pipeline(
+        files,
+        load=_load,
+        ocr=_ocr,
+        llm_batch=_llm_batch,
+        lookup=_lookup,
+        ocr_workers=settings.OCR_CONCURRENCY,
+        max_batch_size=settings.EXTRACT_BATCH_SIZE,
+        max_wait_time=settings.EXTRACT_BATCH_WAIT
+    )
 
 @router.post("/batch-extract", response_model=BatchExtractionResponse)
 async def batch_extract_marksheets(
-    background_tasks: BackgroundTasks,
+    request: Request,
     files: List[UploadFile] = File(...)
 ):
     """
     Extract structured data from multiple marksheets in batch
     """
-    try:
-        logger.info(f"Received batch upload request with {len(files)} files")
-        
-        if len(files) > settings.MAX_BATCH_SIZE:
-            logger.error(f"Batch size {len(files)} exceeds maximum limit of {settings.MAX_BATCH_SIZE}")
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Batch size exceeds maximum limit of {settings.MAX_BATCH_SIZE}"
-            )
-        
-        results = []
-        temp_file_paths = []
-        
-        # Process each file
-        for file in files:
-            try:
-                logger.info(f"Processing file: {file.filename}")
-                
-                # Validate file
-                validate_file(file)
-                
-                # Create temporary file
-                temp_file_path = get_temp_file_path(file.filename)
-                temp_file_paths.append(temp_file_path)
-                
-                # Save uploaded file to temp location
-                with open(temp_file_path, "wb") as buffer:
-                    shutil.copyfileobj(file.file, buffer)
-                
-                # Extract data
-                extractor = MarksheetExtractor()
-                start_time = time.time()
-                result_dict = await extractor.extract(temp_file_path)
-                processing_time = time.time() - start_time
-                
-                # Create response with additional metadata
-                result = ExtractionResponse(
-                    candidate_details=result_dict["candidate_details"],
-                    subjects=result_dict["subjects"],
-                    overall_result=result_dict["overall_result"],
-                    issue_details=result_dict["issue_details"],
-                    processing_time=processing_time,
-                    file_type=file.content_type,
-                    file_size=file.size
-                )
-                
-                results.append(result)
-                logger.info(f"Successfully processed {file.filename}")
-                
-            except Exception as e:
-                logger.error(f"Error processing {file.filename}: {str(e)}")
-                results.append({
-                    "error": f"Error processing {file.filename}: {str(e)}",
-                    "filename": file.filename
-                })
-        
-        # Schedule cleanup
-        for temp_file_path in temp_file_paths:
-            background_tasks.add_task(os.remove, temp_file_path)
-        
-        logger.info(f"Batch processing completed. Results: {len(results)} files processed")
-        return {"results": results}
-        
-    except Exception as e:
-        logger.error(f"Error during batch extraction: {str(e)}")
-        logger.error(f"Full traceback: {traceback.format_exc()}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    logger.info("Received batch upload request with %d files", len(files))
+    _check_batch_size(files)
+    
+    results: List[Any] = [None] * len(files)
+    async for index, outcome in _iter_batch(request, files):
+        if isinstance(outcome, Exception):
+            results[index] = _batch_error(files[index], outcome)
+        else:
+            results[index] = outcome
+    
+    logger.info("Batch processing completed. Results: %d files processed", len(results))
+    return {"results": results}
+
+@router.post("/batch-extract-stream")
+async def batch_extract_marksheets_stream(
+    request: Request,
+    files: List[UploadFile] = File(...)
+):
+    """
+    Extract structured data from multiple marksheets, streaming one NDJSON
+    line per file as soon as it completes
+    """
+    logger.info("Received streaming batch upload request with %d files", len(files))
+    _check_batch_size(files)
+    
+    async def _lines() -> AsyncIterator[bytes]:
+        # Lines are serialized directly rather than through a response_model,
+        # so the responses are validated as they are built
+        async for index, outcome in _iter_batch(request, files, validate=True):
+            if isinstance(outcome, Exception):
+                line = _batch_error(files[index], outcome)
+            else:
+                line = outcome.model_dump()
+                line["filename"] = files[index].filename
+            line["index"] = index
+            yield orjson.dumps(line) + b"\n"
+    
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
@@ -163,27 +303,22 @@ async def health_check():
     logger.info("Health check requested")
     return {"status": "healthy", "version": "1.0.0"}
 @router.get("/debug-ocr")
-async def debug_ocr(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def debug_ocr(request: Request, file: UploadFile = File(...)):
     """
     Debug endpoint to check OCR text extraction
     """
     try:
         # Validate file
         validate_file(file)
+        await validate_file_signature(file)
         
-        # Create temporary file
-        temp_file_path = get_temp_file_path(file.filename)
-        
-        # Save uploaded file to temp location
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Extract OCR text
-        extractor = MarksheetExtractor()
-        ocr_result = await extractor.ocr_service.extract_text(temp_file_path)
-        
-        # Schedule cleanup
-        background_tasks.add_task(os.remove, temp_file_path)
+        # The temp file is removed as soon as the block exits, even on error
+        async with temp_upload_file(file.content_type) as temp_file:
+            await write_upload_file(file, temp_file)
+            
+            # Extract OCR text
+            extractor = get_extractor(request)
+            ocr_result = await extractor.ocr_service.extract_text(temp_file.name)
         
         return {
             "ocr_text": ocr_result["text"],
@@ -192,4 +327,4 @@ async def debug_ocr(background_tasks: BackgroundTasks, file: UploadFile = File(.
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
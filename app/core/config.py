@@ -1,26 +1,107 @@
 import os
 import json
 from typing import List
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
+def _default_temp_dir() -> str:
+    """
+    Prefer the RAM-backed /dev/shm for temporary uploads, falling back to /tmp
+    """
+    try:
+        stats = os.statvfs("/dev/shm")
+    except (AttributeError, OSError):
+        return "/tmp"
+    if stats.f_flag & getattr(os, "ST_NOEXEC", 0) == 0 and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return "/tmp"
+
 class Settings(BaseSettings):
+    # Logging Settings
+    # Defaults to WARNING in production; set LOG_LEVEL=INFO for per-request logs
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "WARNING")
+    
     # API Settings
+    # Exposes the /test-gemini and /test-models diagnostic endpoints
+    DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
     ALLOWED_ORIGINS: List[str] = json.loads(os.getenv("ALLOWED_ORIGINS", '["*"]'))
     
     # File Upload Settings
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10 MB
     ALLOWED_FILE_TYPES: List[str] = ["image/jpeg", "image/png", "image/webp", "application/pdf"]
     MAX_BATCH_SIZE: int = 10
+    # Whole request body limit; 0, the default, sizes it for a full batch of
+    # maximum-size files plus multipart overhead
+    MAX_REQUEST_SIZE: int = 0
+    
+    # Concurrency Settings
+    # OCR jobs allowed to run at once across all requests
+    OCR_CONCURRENCY: int = int(os.getenv("OCR_CONCURRENCY", "8"))
+    # OCR worker processes; 0 runs OCR on threads in the API process instead
+    OCR_WORKERS: int = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 4)))
+    # Threads per process running one document's independent Tesseract
+    # passes (scanned PDF images, preprocessing variants) in parallel
+    OCR_THREADS: int = int(os.getenv("OCR_THREADS", "4"))
+    
+    # Micro-batching Settings
+    # Concurrent extractions are grouped into one LLM call; a size of 1 disables batching
+    EXTRACT_BATCH_SIZE: int = int(os.getenv("EXTRACT_BATCH_SIZE", "8"))
+    EXTRACT_BATCH_WAIT: float = float(os.getenv("EXTRACT_BATCH_WAIT", "0.08"))
     
     # LLM Settings
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     GEMINI_MODEL: str = "gemini-pro"
+    # Throttling for Gemini calls; transient 429/quota errors are retried with backoff
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+    GEMINI_RPS: float = float(os.getenv("GEMINI_RPS", "2"))
+    GEMINI_MAX_RETRIES: int = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+    GEMINI_RETRY_MIN_WAIT: float = 1.0
+    GEMINI_RETRY_MAX_WAIT: float = 30.0
+    
+    # Run a warmup extraction at startup so the first request doesn't pay for cold starts
+    EXTRACT_WARMUP: bool = os.getenv("EXTRACT_WARMUP", "true").lower() == "true"
     
     # OCR Settings
     TESSERACT_PATH: str = os.getenv("TESSERACT_PATH", "")
+    # tessdata directory (with a trailing slash) for the in-process tesserocr
+    # engine; empty uses its built-in default
+    TESSDATA_PATH: str = os.getenv("TESSDATA_PATH", "")
+    # Read images as a single text block (PSM 6), retrying with automatic page
+    # segmentation only below this average word confidence; false sweeps all
+    # six page segmentation modes
+    OCR_FAST_MODE: bool = os.getenv("OCR_FAST_MODE", "true").lower() == "true"
+    OCR_FAST_MIN_CONFIDENCE: float = float(os.getenv("OCR_FAST_MIN_CONFIDENCE", "40"))
+    # Fast mode also keeps the first preprocessing method's text, without
+    # trying the others, when it scores at least this text confidence
+    OCR_FAST_METHOD_CONFIDENCE: float = float(os.getenv("OCR_FAST_METHOD_CONFIDENCE", "85"))
+    # Larger scans are shrunk so their longer side is at most this many pixels
+    # before preprocessing and OCR; 0 keeps the original size
+    OCR_MAX_IMAGE_SIDE: int = int(os.getenv("OCR_MAX_IMAGE_SIDE", "2000"))
+    # Resolution scanned PDF pages are rendered at for OCR
+    OCR_PDF_DPI: int = int(os.getenv("OCR_PDF_DPI", "200"))
+    
+    # Cache Settings
+    # Directory for the content-addressable extraction cache; empty disables it
+    EXTRACTION_CACHE_DIR: str = os.getenv("EXTRACTION_CACHE_DIR", "")
+    # Number of recent results kept in memory in front of the directory; 0, the
+    # default, disables it, so the cache stays off unless configured
+    EXTRACTION_CACHE_SIZE: int = int(os.getenv("EXTRACTION_CACHE_SIZE", 0))
+    # Number of LLM results kept in memory, keyed by the cleaned OCR text so
+    # re-scans of the same marksheet skip Gemini; 0 disables it
+    LLM_CACHE_SIZE: int = int(os.getenv("LLM_CACHE_SIZE", 256))
     
     # Temp Directory
-    TEMP_DIR: str = os.getenv("TEMP_DIR", "/tmp")
+    TEMP_DIR: str = os.getenv("TEMP_DIR", _default_temp_dir())
+    # Leftover temp files older than this are removed at startup
+    TEMP_FILE_MAX_AGE: int = 60 * 60  # 1 hour
+    
+    @model_validator(mode="after")
+    def _derive_max_request_size(self) -> "Settings":
+        # Derived after validation, so file and batch limits set in the
+        # environment are taken into account
+        if not self.MAX_REQUEST_SIZE:
+            self.MAX_REQUEST_SIZE = self.MAX_FILE_SIZE * self.MAX_BATCH_SIZE + 1024 * 1024
+        return self
     
     class Config:
         env_file = ".env"
@@ -1,5 +1,5 @@
 from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from typing import Union, Dict, Any
 
@@ -9,12 +9,16 @@ class MarksheetExtractionException(HTTPException):
     """
     def __init__(self, status_code: int, detail: Any = None, headers: Dict[str, str] = None):
         super().__init__(status_code=status_code, detail=detail, headers=headers)
+    
+    def __reduce__(self):
+        # Keep the exception picklable so it can cross the OCR process pool
+        return (self.__class__, (self.status_code, self.detail, self.headers))
 
 async def marksheet_exception_handler(request: Request, exc: MarksheetExtractionException):
     """
     Handler for MarksheetExtractionException
     """
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail, "status_code": exc.status_code}
     )
@@ -23,7 +27,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     """
     Handler for RequestValidationError
     """
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={"detail": exc.errors(), "status_code": 422}
     )
\ No newline at end of file
@@ -0,0 +1,13 @@
+import logging
+from contextvars import ContextVar
+
+# ID of the request being handled, for correlating log lines
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+class RequestIdFilter(logging.Filter):
+    """
+    Attach the current request ID to every log record
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
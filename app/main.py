@@ -1,10 +1,16 @@
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import ORJSONResponse, HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import asyncio
 import time
-import traceback
+import uuid
 import logging
+from typing import Any, Dict, List
+import google.generativeai as genai
 from app.api.routes import router
 from app.core.exceptions import (
     MarksheetExtractionException,
@@ -12,18 +18,85 @@ from app.core.exceptions import (
     validation_exception_handler
 )
 from app.core.config import settings
+from app.core.request_context import request_id_var, RequestIdFilter
+from app.core.middleware import MaxRequestSizeMiddleware
+from app.services.extractor import MarksheetExtractor
+from app.services.batching import AsyncBatchQueue
+from app.services.ocr import init_ocr_worker
+from app.utils.file_utils import cleanup_stale_temp_files, ensure_temp_dir
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(
+    level=settings.LOG_LEVEL.upper(),
+    format="%(levelname)s:%(name)s:[%(request_id)s] %(message)s"
+)
+for handler in logging.getLogger().handlers:
+    handler.addFilter(RequestIdFilter())
 logger = logging.getLogger(__name__)
 
+# Application lifespan: build shared services once at startup
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the temp directory up front rather than on a request, then
+    # sweep temp files leaked by crashed workers
+    ensure_temp_dir()
+    removed = cleanup_stale_temp_files(settings.TEMP_FILE_MAX_AGE)
+    if removed:
+        logger.info("Removed %d stale temp files from %s", removed, settings.TEMP_DIR)
+    
+    # Run OCR in worker processes so it uses every core instead of contending for the GIL
+    ocr_pool = None
+    if settings.OCR_WORKERS > 0:
+        ocr_pool = ProcessPoolExecutor(
+            max_workers=settings.OCR_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_ocr_worker
+        )
+        app.state.ocr_pool = ocr_pool
+    
+    try:
+        app.state.extractor = MarksheetExtractor()
+        app.state.extractor.ocr_service.executor = ocr_pool
+        logger.info("Initialized shared marksheet extractor")
+    except Exception as e:
+        # Routes create the extractor lazily if startup initialization fails
+        logger.error("Failed to initialize marksheet extractor at startup: %s", e)
+    
+    if settings.EXTRACT_WARMUP and getattr(app.state, "extractor", None) is not None:
+        try:
+            warmup_time = await app.state.extractor.warm_up()
+            logger.info("Extractor warmup completed in %.2fs", warmup_time)
+        except Exception as e:
+            # A failed warmup (e.g. Gemini unreachable) shouldn't block startup
+            logger.warning("Extractor warmup failed: %s", e)
+    
+    # Coalesce the LLM step of concurrent extractions into batched calls
+    queue = None
+    if settings.EXTRACT_BATCH_SIZE > 1 and getattr(app.state, "extractor", None) is not None:
+        queue = AsyncBatchQueue(
+            app.state.extractor.extract_from_ocr_batch,
+            max_batch_size=settings.EXTRACT_BATCH_SIZE,
+            max_wait_time=settings.EXTRACT_BATCH_WAIT
+        )
+        queue.start()
+        app.state.extraction_queue = queue
+    
+    yield
+    
+    if queue is not None:
+        await queue.stop()
+    if ocr_pool is not None:
+        ocr_pool.shutdown(wait=False, cancel_futures=True)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Marksheet Extractor API",
     description="AI-based API for extracting structured data from marksheets",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -35,6 +108,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Bound request bodies before multipart parsing spools them to disk
+app.add_middleware(MaxRequestSizeMiddleware, max_size=settings.MAX_REQUEST_SIZE)
+
 # Include API routes
 app.include_router(router, prefix="/api/v1")
 
@@ -45,21 +121,33 @@ app.add_exception_handler(RequestValidationError, validation_exception_handler)
 # Global exception handler for unhandled exceptions
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unhandled exception: {str(exc)}")
-    logger.error(f"Full traceback: {traceback.format_exc()}")
-    return JSONResponse(
+    # Runs outside the request middleware, so read the ID from request state
+    request_id = getattr(request.state, "request_id", "-")
+    logger.error(
+        "Unhandled exception [%s]: %s", request_id, exc,
+        exc_info=(type(exc), exc, exc.__traceback__)
+    )
+    return ORJSONResponse(
         status_code=500,
-        content={"detail": f"Internal server error: {str(exc)}", "traceback": traceback.format_exc()}
+        content={"detail": "Internal server error", "request_id": request_id}
     )
 
 # Request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    logger.info(f"Request: {request.url} completed in {process_time:.4f}s")
-    return response
+    # Tag the request with an ID so its log lines can be correlated
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    request.state.request_id = request_id
+    token = request_id_var.set(request_id)
+    try:
+        start_time = time.time()
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        logger.info("Request: %s completed in %.4fs", request.url, process_time)
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        request_id_var.reset(token)
 
 # Root endpoint
 @app.get("/", response_class=HTMLResponse)
@@ -78,26 +166,40 @@ async def read_root(request: Request):
 async def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
-# Test endpoint to check if Gemini API key is set
-@app.get("/test-gemini")
-async def test_gemini():
-    try:
-        if not settings.GEMINI_API_KEY or settings.GEMINI_API_KEY == "your_gemini_api_key_here":
-            return {"status": "error", "message": "Gemini API key is not set properly"}
-        return {"status": "success", "message": "Gemini API key is set"}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+# Diagnostic endpoints, only exposed when DEBUG is enabled
+_MODEL_LIST_TTL = 60 * 60  # 1 hour
+_model_list_cache: Dict[str, Any] = {"models": None, "expires_at": 0.0}
 
-# Test endpoint to list available models
-@app.get("/test-models")
-async def test_models():
-    try:
-        import google.generativeai as genai
+def _list_models() -> List[str]:
+    """
+    List the Gemini models available to the configured key, cached for an hour
+    """
+    now = time.monotonic()
+    if _model_list_cache["models"] is None or now >= _model_list_cache["expires_at"]:
         genai.configure(api_key=settings.GEMINI_API_KEY)
-        models = [m.name for m in genai.list_models()]
-        return {"status": "success", "models": models}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+        _model_list_cache["models"] = [m.name for m in genai.list_models()]
+        _model_list_cache["expires_at"] = now + _MODEL_LIST_TTL
+    return _model_list_cache["models"]
+
+if settings.DEBUG:
+    # Test endpoint to check if Gemini API key is set
+    @app.get("/test-gemini")
+    async def test_gemini():
+        try:
+            if not settings.GEMINI_API_KEY or settings.GEMINI_API_KEY == "your_gemini_api_key_here":
+                return {"status": "error", "message": "Gemini API key is not set properly"}
+            return {"status": "success", "message": "Gemini API key is set"}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+    
+    # Test endpoint to list available models
+    @app.get("/test-models")
+    async def test_models():
+        try:
+            models = await asyncio.to_thread(_list_models)
+            return {"status": "success", "models": models}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class AsyncBatchQueue:
+    """
+    Collects items submitted by concurrent callers and hands them to a
+    batch function in groups, so one downstream call serves many requests
+    """
+    
+    def __init__(
+        self,
+        process_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 8,
+        max_wait_time: float = 0.08
+    ):
+        """
+        Args:
+            process_fn: Coroutine taking a list of items and returning one
+                result (or exception) per item, in the same order
+            max_batch_size: Largest number of items dispatched together
+            max_wait_time: Seconds to wait for a batch to fill up
+        """
+        self.process_fn = process_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_time = max_wait_time
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+    
+    def start(self) -> None:
+        """
+        Start the collector; must be called from within the running event loop
+        """
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._process_loop())
+    
+    async def stop(self) -> None:
+        """
+        Stop the collector and wait for batches already dispatched
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+    
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue an item and wait for its result
+        
+        Args:
+            item: Item to process
+            
+        Returns:
+            Any: Result produced for the item by the batch function
+        """
+        if self._worker is None:
+            raise RuntimeError("AsyncBatchQueue is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+    
+    async def _process_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_time
+            
+            # Keep collecting until the batch is full or the wait expires
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            task = asyncio.create_task(self._process_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+    
+    async def _process_batch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        logger.info(f"Dispatching batch of {len(batch)} items")
+        items = [item for item, _ in batch]
+        try:
+            results = await self.process_fn(items)
+        except Exception as e:
+            results = [e] * len(batch)
+        
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
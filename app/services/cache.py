@@ -0,0 +1,112 @@
+import os
+import hashlib
+import uuid
+import aiofiles
+import orjson
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ExtractionCache:
+    """
+    Content-addressable cache of extraction results keyed by the SHA-256 of
+    the uploaded file bytes, with an in-memory LRU in front of the optional
+    on-disk store
+    """
+    def __init__(self, cache_dir: str = "", max_entries: int = 0):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            logger.info(f"Extraction cache enabled at: {self.cache_dir}")
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cache_dir) or self.max_entries > 0
+    
+    def make_key(self, data: bytes, version: str) -> str:
+        """
+        Build a cache key for a file
+        
+        Args:
+            data: Raw file contents
+            version: Model/prompt version the result was produced with
+            
+        Returns:
+            str: Cache key
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        namespace = hashlib.sha256(version.encode()).hexdigest()[:12]
+        return f"{namespace}-{digest}"
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached extraction result
+        
+        Args:
+            key: Cache key from make_key
+            
+        Returns:
+            Optional[Dict]: Cached result, or None on a miss
+        """
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            return value
+        
+        if not self.cache_dir:
+            return None
+        
+        try:
+            async with aiofiles.open(self._path(key), "rb") as f:
+                value = orjson.loads(await f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {key}: {str(e)}")
+            return None
+        
+        self._remember(key, value)
+        return value
+    
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Store an extraction result
+        
+        Args:
+            key: Cache key from make_key
+            value: JSON-serializable extraction result
+        """
+        self._remember(key, value)
+        
+        if not self.cache_dir:
+            return
+        
+        path = self._path(key)
+        # Write to a sibling file and rename so readers never see partial JSON
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            async with aiofiles.open(temp_path, "wb") as f:
+                await f.write(orjson.dumps(value))
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry {key}: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+extraction_cache = ExtractionCache(settings.EXTRACTION_CACHE_DIR, settings.EXTRACTION_CACHE_SIZE)
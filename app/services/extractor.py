@@ -1,24 +1,188 @@
 import os
-import json
 import re
+import time
 import traceback
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Awaitable, Tuple, Union
 import asyncio
+import aiofiles
+import orjson
 from app.services.ocr import OCRService
 from app.services.llm import LLMService
-from app.utils.confidence import calculate_confidence
-from app.api.schemas import (
-    ExtractionResponse, 
-    CandidateDetails, 
-    SubjectMarks, 
-    OverallResult, 
-    IssueDetails
-)
+from app.services.batching import AsyncBatchQueue
+from app.services.pipeline import run_pipeline
+from app.utils.confidence import calculate_confidence_sync
+from app.api.schemas import ExtractionResponse
+from app.core.config import settings
 from app.core.exceptions import MarksheetExtractionException
 import logging
 
+# RE2 matches in linear time; the backtracking re module is the fallback
+try:
+    import re2
+except ImportError:
+    re2 = None
+
 logger = logging.getLogger(__name__)
 
+def _compile_linear(pattern: str, flags: int = 0) -> "re.Pattern":
+    """
+    Compile a pattern with RE2 when it's available, so patterns with
+    overlapping repeats can't backtrack quadratically on long OCR text
+    """
+    if re2 is None:
+        return re.compile(pattern, flags)
+    inline = "".join(
+        letter for flag, letter in ((re.IGNORECASE, "i"), (re.MULTILINE, "m")) if flags & flag
+    )
+    return re2.compile(f"(?{inline}){pattern}" if inline else pattern)
+
+# Subject patterns tried first, for the layout of the sample marksheets. They
+# only capture digits, so they run case-sensitively on the lowercased text,
+# which re scans much faster than with IGNORECASE
+_EXPECTED_SUBJECT_PATTERNS = tuple(
+    (re.compile(pattern), subject_name)
+    for pattern, subject_name in [
+        (r'language\s*[:\-]?\s*(\d+)', "Language"),
+        (r'science\s*[:\-]?\s*(\d+)', "Science"),
+        (r'india\s*&\s*people\s*[:\-]?\s*(\d+)', "India & People"),
+        (r'india\s+and\s+her\s+people\s*[:\-]?\s*(\d+)', "India & People"),
+        (r'additional\s*[:\-]?\s*(\d+)', "Additional"),
+    ]
+)
+
+# Generic subject table layouts
+_TABLE_PATTERNS = tuple(_compile_linear(pattern, re.IGNORECASE) for pattern in [
+    r'([A-Za-z\s&]+)\s*\|\s*(\d+)\s*\|\s*(\d+)\s*\|\s*([A-Za-z0-9+-]*)',
+    r'([A-Za-z\s&]+)\s+(\d+)\s+(\d+)\s+([A-Za-z0-9+-]*)',
+    r'([A-Za-z\s&]+):\s*(\d+)\s*/\s*(\d+)',
+    r'([A-Za-z\s&]+)\s*-\s*(\d+)',
+])
+
+# First "<name> <number>" on each line; [^\S\n] is \s without the newline so a
+# match never spans lines
+_LINE_SUBJECT_RE = _compile_linear(
+    r'^[^\n]*?((?:[A-Za-z&]|[^\S\n]){3,})[^\S\n]*[:\-]?[^\S\n]*(\d+)',
+    re.MULTILINE
+)
+
+# Words that mark a table header or summary row rather than a subject; they
+# match anywhere in the lowercased name
+_EXCLUDE_TERMS = (
+    'total', 'result', 'division', 'percentage', 'grade', 'marks', 'obtained',
+    'maximum', 'subject', 'name', 'roll', 'registration', 'board', 'school', 'college'
+)
+
+def _term_trie_pattern(terms) -> "re.Pattern":
+    """
+    Compile terms into an alternation factored on their first letter, so
+    each text position is checked against one branch instead of every term
+    """
+    branches: Dict[str, List[str]] = {}
+    for term in terms:
+        branches.setdefault(term[0], []).append(re.escape(term[1:]))
+    return re.compile("|".join(
+        f"{re.escape(first)}(?:{'|'.join(rests)})" for first, rests in sorted(branches.items())
+    ))
+
+_EXCLUDE_TERMS_RE = _term_trie_pattern(_EXCLUDE_TERMS)
+
+def _fuse_patterns(
+    patterns: List[str], flags: int = 0, compiler=re.compile
+) -> Tuple["re.Pattern", Tuple["re.Pattern", ...]]:
+    """
+    Combine alternative patterns, each with one capture group, into a single
+    regex so the text is usually scanned once per field instead of once per
+    pattern; the patterns are also kept compiled on their own, in priority order
+    """
+    fused = compiler("|".join(f"(?:{pattern})" for pattern in patterns), flags)
+    return fused, tuple(compiler(pattern, flags) for pattern in patterns)
+
+def _search_fused(fused_patterns: Tuple["re.Pattern", Tuple["re.Pattern", ...]], text: str) -> Optional[str]:
+    """
+    Value captured by the first pattern, in priority order, that matches
+    anywhere in the text, as if each pattern were searched in turn
+
+    Args:
+        fused_patterns: The fused regex and its patterns from _fuse_patterns
+        text: Text to search
+
+    Returns:
+        The captured value, or None when no pattern matches
+    """
+    fused, patterns = fused_patterns
+    match = fused.search(text)
+    if match is None:
+        return None
+    
+    # The fused match is the leftmost one, so a higher-priority pattern can
+    # only match further along; only those patterns need a search of their own
+    index = next(i for i, group in enumerate(match.groups()) if group is not None)
+    for pattern in patterns[:index]:
+        earlier = pattern.search(text)
+        if earlier:
+            return earlier.group(1)
+    return match.group(index + 1)
+
+# Field patterns for _post_process_missing_fields; the DOB labels are case-sensitive.
+# The date patterns have an unanchored date-first alternative that re retries at
+# every digit, so they go through RE2 like the subject table patterns
+_DOB_RE = _fuse_patterns([
+    r'Date of Birth[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
+    r'DOB[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
+    r'Birth[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
+    r'Born[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
+    r'(\d{1,2}[-/]\d{1,2}[-/]\d{4})\s*(?i:DOB|Birth|Born)',
+], compiler=_compile_linear)
+
+_REG_RE = _fuse_patterns([
+    r'Registration No[:\s]+([A-Za-z0-9\-\/]+)',
+    r'Reg\. No[:\s]+([A-Za-z0-9\-\/]+)',
+    r'Reg[:\s]+([A-Za-z0-9\-\/]+)',
+    r'Registration[:\s]+([A-Za-z0-9\-\/]+)',
+], re.IGNORECASE)
+
+_ISSUE_DATE_RE = _fuse_patterns([
+    r'Date of Issue[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
+    r'Issue Date[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
+    r'Dated[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
+    r'(\d{1,2}[-/]\d{1,2}[-/]\d{4})\s*(?i:Date|Dated)',
+], re.IGNORECASE, compiler=_compile_linear)
+
+_PLACE_RE = _fuse_patterns([
+    r'Place[:\s]+([A-Za-z\s]+)',
+    r'Issued at[:\s]+([A-Za-z\s]+)',
+    r'Place of Issue[:\s]+([A-Za-z\s]+)',
+], re.IGNORECASE)
+
+def _dash_date(value: str) -> str:
+    return value.replace('/', '-')
+
+# Fields _post_process_missing_fields can recover from the OCR text: the
+# section and field, the fused pattern, label keywords (lowercased; every
+# alternative of the pattern contains one, so the regex can be skipped when
+# none is in the text) and how to normalise the captured value
+_MISSING_FIELD_PATTERNS = (
+    ("candidate_details", "dob", _DOB_RE, ("birth", "dob", "born"), _dash_date),
+    ("candidate_details", "registration_no", _REG_RE, ("reg",), str.strip),
+    ("issue_details", "date", _ISSUE_DATE_RE, ("date",), _dash_date),
+    ("issue_details", "place", _PLACE_RE, ("place", "issued at"), str.strip),
+)
+
+# Content types of the file extensions extract_many accepts
+_EXTENSION_CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+# 1x1 white PNG pushed through the pipeline at startup to trigger lazy initialization
+WARMUP_PNG = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x00\x00\x00\x00"
+    b":~\x9bU\x00\x00\x00\nIDATx\x9cc\xf8\x0f\x00\x01\x01\x01\x00\xb18\xf6\x14\x00\x00\x00\x00IEND\xaeB`\x82"
+)
+
 class MarksheetExtractor:
     """
     Main class for extracting structured data from marksheets
@@ -37,20 +201,105 @@ class MarksheetExtractor:
         Returns:
             Dict: Structured data extracted from the marksheet
         """
-        try:
-            logger.info(f"Starting extraction for file: {file_path}")
-            logger.info(f"File exists: {os.path.exists(file_path)}")
-            logger.info(f"File size: {os.path.getsize(file_path) if os.path.exists(file_path) else 'N/A'} bytes")
+        logger.info(f"Starting extraction for file: {file_path}")
+        if logger.isEnabledFor(logging.INFO):
+            # One stat() answers both questions
+            try:
+                file_size = os.stat(file_path).st_size
+            except OSError:
+                logger.info("File exists: False")
+            else:
+                logger.info("File exists: True")
+                logger.info("File size: %d bytes", file_size)
+        
+        return await self._extract(self.ocr_service.extract_text(file_path))
+    
+    async def extract_many(self, file_paths: List[str]) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Extract several marksheet files, overlapping one file's OCR with
+        another's LLM call and sharing LLM calls between files
+        
+        Args:
+            file_paths: Paths to the marksheet files (JPG/PNG/PDF)
+            
+        Returns:
+            List: Extraction result (or the error raised) for each file, in input order
+        """
+        logger.info(f"Starting extraction for {len(file_paths)} files")
+        
+        async def _load(file_path: str) -> Tuple[bytes, str]:
+            content_type = _EXTENSION_CONTENT_TYPES.get(os.path.splitext(file_path)[1].lower())
+            if content_type is None:
+                raise MarksheetExtractionException(
+                    status_code=400,
+                    detail=f"Unsupported file type: {file_path}"
+                )
+            async with aiofiles.open(file_path, "rb") as f:
+                return await f.read(), content_type
+        
+        async def _ocr(loaded: Tuple[bytes, str]) -> Dict[str, Any]:
+            try:
+                return await self.ocr_service.extract_text_from_bytes(*loaded)
+            except Exception as e:
+                raise self._extraction_error(e)
+        
+        return await run_pipeline(
+            file_paths,
+            load=_load,
+            ocr=_ocr,
+            llm_batch=self.extract_from_ocr_batch,
+            ocr_workers=settings.OCR_CONCURRENCY,
+            max_batch_size=settings.EXTRACT_BATCH_SIZE,
+            max_wait_time=settings.EXTRACT_BATCH_WAIT
+        )
+    
+    async def extract_bytes(self, data: bytes, content_type: str) -> Dict[str, Any]:
+        """
+        Extract structured data from an in-memory marksheet
+        
+        Args:
+            data: Raw contents of the marksheet file (JPG/PNG/PDF)
+            content_type: MIME type of the file
             
+        Returns:
+            Dict: Structured data extracted from the marksheet
+        """
+        logger.info(f"Starting extraction for {len(data)} bytes of {content_type}")
+        
+        return await self._extract(self.ocr_service.extract_text_from_bytes(data, content_type))
+    
+    async def warm_up(self) -> float:
+        """
+        Run a tiny image through OCR and the LLM so that Tesseract data, the
+        Gemini client and its connection are initialized before real traffic
+        
+        Returns:
+            float: Time taken in seconds
+        """
+        start_time = time.time()
+        await self.extract_bytes(WARMUP_PNG, "image/png")
+        return time.time() - start_time
+    
+    async def _extract(self, ocr_task: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run the OCR -> LLM -> confidence pipeline
+        
+        Args:
+            ocr_task: Pending OCR call producing the text and metadata
+            
+        Returns:
+            Dict: Structured data extracted from the marksheet
+        """
+        try:
             # Extract text using OCR
             logger.info("Starting OCR extraction")
-            ocr_result = await self.ocr_service.extract_text(file_path)
+            ocr_result = await ocr_task
             logger.info(f"OCR extraction completed. Text length: {len(ocr_result.get('text', ''))}")
             
             # Log the OCR text (first 500 chars)
             ocr_text = ocr_result.get('text', '')
             if ocr_text:
-                logger.info(f"OCR text preview: {ocr_text[:500]}...")
+                logger.debug("OCR text preview: %.500s...", ocr_text)
             else:
                 logger.warning("OCR returned empty text!")
             
@@ -60,35 +309,8 @@ class MarksheetExtractor:
                 ocr_text, 
                 ocr_result.get("metadata", {})
             )
-            logger.info(f"LLM extraction completed. Data keys: {list(structured_data.keys())}")
-            logger.debug(f"LLM structured data: {json.dumps(structured_data, indent=2)}")
             
-            # Fallback for subjects if LLM didn't extract any
-            if not structured_data.get("subjects"):
-                logger.warning("LLM didn't extract subjects, using fallback method")
-                structured_data["subjects"] = self._extract_subjects_fallback(ocr_text)
-                logger.info(f"Fallback extracted {len(structured_data['subjects'])} subjects")
-            
-            # Post-process to extract missing fields
-            logger.info("Starting post-processing for missing fields")
-            structured_data = self._post_process_missing_fields(structured_data, ocr_text)
-            logger.info("Post-processing completed")
-            
-            # Calculate confidence scores
-            logger.info("Starting confidence calculation")
-            result_with_confidence = await self._add_confidence_scores(
-                structured_data, 
-                ocr_result
-            )
-            logger.info("Confidence calculation completed")
-            
-            # Validate and clean data
-            logger.info("Starting data validation")
-            validated_data = self._validate_and_clean_data(result_with_confidence)
-            logger.info("Data validation completed")
-            
-            logger.info("Extraction completed successfully")
-            return validated_data
+            return await self._build_result(structured_data, ocr_result)
             
         except MarksheetExtractionException as e:
             logger.error(f"Marksheet extraction error: {str(e)}")
@@ -105,11 +327,134 @@ class MarksheetExtractor:
                 detail=f"Error during extraction: {str(e)}"
             )
     
+    async def extract_bytes_batched(
+        self,
+        data: bytes,
+        content_type: str,
+        queue: AsyncBatchQueue
+    ) -> Dict[str, Any]:
+        """
+        Extract an in-memory marksheet, sharing the LLM call with other
+        concurrent extractions
+        
+        OCR starts immediately; only the OCR result waits in the queue, which
+        hands groups of them to extract_from_ocr_batch.
+        
+        Args:
+            data: Raw contents of the marksheet file (JPG/PNG/PDF)
+            content_type: MIME type of the file
+            queue: Batch queue wrapping extract_from_ocr_batch
+            
+        Returns:
+            Dict: Structured data extracted from the marksheet
+        """
+        try:
+            ocr_result = await self.ocr_service.extract_text_from_bytes(data, content_type)
+        except Exception as e:
+            raise self._extraction_error(e)
+        
+        return await queue.submit(ocr_result)
+    
+    async def extract_from_ocr_batch(
+        self,
+        ocr_results: List[Dict[str, Any]]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Extract structured data for several OCR results with a single LLM call
+        
+        Args:
+            ocr_results: OCR text and metadata for each marksheet
+            
+        Returns:
+            List: Extraction result (or the error raised) for each OCR result, in input order
+        """
+        structured_items = await self.llm_service.extract_structured_data_batch(
+            [ocr_result.get("text", "") for ocr_result in ocr_results]
+        )
+        
+        results: List[Any] = []
+        for ocr_result, structured_data in zip(ocr_results, structured_items):
+            try:
+                if isinstance(structured_data, Exception):
+                    raise structured_data
+                results.append(await self._build_result(structured_data, ocr_result))
+            except Exception as e:
+                results.append(self._extraction_error(e))
+        
+        return results
+    
+    def _extraction_error(self, error: Exception) -> MarksheetExtractionException:
+        logger.error(f"Error during batched extraction: {str(error)}")
+        return MarksheetExtractionException(
+            status_code=500,
+            detail=f"Error during extraction: {str(error)}"
+        )
+    
+    async def _build_result(
+        self,
+        structured_data: Dict[str, Any],
+        ocr_result: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Fill gaps in the LLM output and attach confidence scores
+        
+        Args:
+            structured_data: Structured data extracted by the LLM
+            ocr_result: OCR text and metadata the data was extracted from
+            
+        Returns:
+            Dict: Validated extraction result
+        """
+        ocr_text = ocr_result.get('text', '')
+        
+        logger.info(f"LLM extraction completed. Data keys: {list(structured_data.keys())}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("LLM structured data: %s", orjson.dumps(structured_data).decode())
+        
+        # Fallback for subjects if LLM didn't extract any
+        if not structured_data.get("subjects"):
+            logger.warning("LLM didn't extract subjects, using fallback method")
+            structured_data["subjects"] = self._extract_subjects_fallback(ocr_text)
+            logger.info(f"Fallback extracted {len(structured_data['subjects'])} subjects")
+        
+        # Post-process to extract missing fields, unless the LLM filled them all
+        if any(not structured_data[section][field] for section, field, *_ in _MISSING_FIELD_PATTERNS):
+            logger.info("Starting post-processing for missing fields")
+            structured_data = self._post_process_missing_fields(structured_data, ocr_text)
+            logger.info("Post-processing completed")
+        
+        # Calculate confidence scores
+        logger.info("Starting confidence calculation")
+        result_with_confidence = await self._add_confidence_scores(
+            structured_data, 
+            ocr_result
+        )
+        logger.info("Confidence calculation completed")
+        
+        # Validate and clean data
+        logger.info("Starting data validation")
+        validated_data = self._validate_and_clean_data(result_with_confidence)
+        logger.info("Data validation completed")
+        
+        logger.info("Extraction completed successfully")
+        return validated_data
+    
     def _extract_subjects_fallback(self, ocr_text: str) -> List[Dict[str, Any]]:
         logger.info("Using fallback subject extraction")
-        logger.info(f"OCR text for fallback: {ocr_text[:200]}..." if ocr_text else "OCR text is empty!")
+        if ocr_text:
+            logger.debug("OCR text for fallback: %.200s...", ocr_text)
+        else:
+            logger.info("OCR text is empty!")
         
         subjects = []
+        seen = set()
+        
+        def add_subject(subject: Dict[str, Any]) -> None:
+            # Keep the first occurrence of each subject name
+            key = subject["subject"].lower()
+            if key not in seen:
+                seen.add(key)
+                subjects.append(subject)
         
         # If OCR text is empty, return empty list
         if not ocr_text.strip():
@@ -117,43 +462,34 @@ class MarksheetExtractor:
             return subjects
         
         # First, look for the specific expected subjects
-        expected_patterns = [
-            (r'Language\s*[:\-]?\s*(\d+)', "Language"),
-            (r'Science\s*[:\-]?\s*(\d+)', "Science"),
-            (r'India\s*&\s*People\s*[:\-]?\s*(\d+)', "India & People"),
-            (r'India\s+and\s+Her\s+People\s*[:\-]?\s*(\d+)', "India & People"),
-            (r'Additional\s*[:\-]?\s*(\d+)', "Additional"),
-        ]
-        
-        for pattern, subject_name in expected_patterns:
-            matches = re.findall(pattern, ocr_text, re.IGNORECASE)
-            logger.debug(f"Pattern '{pattern}' found {len(matches)} matches for subject '{subject_name}'")
+        ocr_lower = ocr_text.lower()
+        for pattern, subject_name in _EXPECTED_SUBJECT_PATTERNS:
+            matches = pattern.findall(ocr_lower)
+            logger.debug(f"Pattern '{pattern.pattern}' found {len(matches)} matches for subject '{subject_name}'")
             for match in matches:
-                if match.isdigit():
-                    subjects.append({
-                        "subject": subject_name,
-                        "max_marks": None,
-                        "obtained_marks": int(match),
-                        "grade": None
-                    })
+                add_subject({
+                    "subject": subject_name,
+                    "max_marks": None,
+                    "obtained_marks": int(match),
+                    "grade": None
+                })
         
         # If we found the expected subjects, return them
         if len(subjects) >= 3:
             logger.info(f"Found {len(subjects)} expected subjects, returning them")
             return subjects
         
-        # Otherwise, fall back to generic patterns
+        # Otherwise, fall back to generic patterns. Marks are always captured
+        # by (\d+) groups, so int() can't fail on them
         logger.info("Not enough expected subjects found, using generic patterns")
-        table_patterns = [
-            r'([A-Za-z\s&]+)\s*\|\s*(\d+)\s*\|\s*(\d+)\s*\|\s*([A-Za-z0-9+-]*)',
-            r'([A-Za-z\s&]+)\s+(\d+)\s+(\d+)\s+([A-Za-z0-9+-]*)',
-            r'([A-Za-z\s&]+):\s*(\d+)\s*/\s*(\d+)',
-            r'([A-Za-z\s&]+)\s*-\s*(\d+)',
-        ]
-        
-        for pattern in table_patterns:
-            matches = re.findall(pattern, ocr_text, re.IGNORECASE)
-            logger.debug(f"Generic pattern '{pattern}' found {len(matches)} matches")
+        expected_count = len(subjects)
+        for pattern in _TABLE_PATTERNS:
+            # Stop at the first table layout that yields valid subjects
+            if len(subjects) > expected_count:
+                break
+            
+            matches = pattern.findall(ocr_text)
+            logger.debug(f"Generic pattern '{pattern.pattern}' found {len(matches)} matches")
             if matches:
                 for match in matches:
                     if len(match) == 4:
@@ -163,10 +499,10 @@ class MarksheetExtractor:
                         grade = match[3].strip() if match[3] else None
                         
                         if self._is_valid_subject(subject_name):
-                            subjects.append({
+                            add_subject({
                                 "subject": subject_name,
-                                "max_marks": int(max_marks) if max_marks.isdigit() else None,
-                                "obtained_marks": int(obtained_marks) if obtained_marks.isdigit() else None,
+                                "max_marks": int(max_marks),
+                                "obtained_marks": int(obtained_marks),
                                 "grade": grade
                             })
                     
@@ -176,10 +512,10 @@ class MarksheetExtractor:
                         max_marks = match[2].strip()
                         
                         if self._is_valid_subject(subject_name):
-                            subjects.append({
+                            add_subject({
                                 "subject": subject_name,
-                                "max_marks": int(max_marks) if max_marks.isdigit() else None,
-                                "obtained_marks": int(obtained_marks) if obtained_marks.isdigit() else None,
+                                "max_marks": int(max_marks),
+                                "obtained_marks": int(obtained_marks),
                                 "grade": None
                             })
                     
@@ -188,121 +524,61 @@ class MarksheetExtractor:
                         marks = match[1].strip()
                         
                         if self._is_valid_subject(subject_name):
-                            subjects.append({
+                            add_subject({
                                 "subject": subject_name,
                                 "max_marks": None,
-                                "obtained_marks": int(marks) if marks.isdigit() else None,
+                                "obtained_marks": int(marks),
                                 "grade": None
                             })
         
-        # Line-by-line parsing
-        lines = ocr_text.split('\n')
-        for line in lines:
-            subject_match = re.search(r'([A-Za-z\s&]{3,})\s*[:\-]?\s*(\d+)', line)
-            if subject_match:
-                subject_name = subject_match.group(1).strip()
-                marks = subject_match.group(2).strip()
-                
-                if self._is_valid_subject(subject_name):
-                    subjects.append({
-                        "subject": subject_name,
-                        "max_marks": None,
-                        "obtained_marks": int(marks) if marks.isdigit() else None,
-                        "grade": None
-                    })
+        # Line-by-line parsing; a table match can run across lines and swallow
+        # a subject row, so this still runs and adds whatever the tables missed
+        for subject_match in _LINE_SUBJECT_RE.finditer(ocr_text):
+            subject_name = subject_match.group(1).strip()
+            marks = subject_match.group(2).strip()
+            
+            if self._is_valid_subject(subject_name):
+                add_subject({
+                    "subject": subject_name,
+                    "max_marks": None,
+                    "obtained_marks": int(marks),
+                    "grade": None
+                })
         
         logger.info(f"Generic extraction found {len(subjects)} subjects")
         return subjects
     
     def _is_valid_subject(self, subject_name: str) -> bool:
-        exclude_terms = [
-            'total', 'grand total', 'result', 'division', 'percentage',
-            'grade', 'marks', 'obtained', 'maximum', 'subject', 'name',
-            'roll', 'registration', 'board', 'school', 'college'
-        ]
-        
-        subject_lower = subject_name.lower()
-        
-        if any(term in subject_lower for term in exclude_terms):
+        if _EXCLUDE_TERMS_RE.search(subject_name.lower()):
             return False
         
         if len(subject_name) < 3 or not subject_name[0].isalpha():
             return False
         
-        letter_ratio = sum(c.isalpha() for c in subject_name) / len(subject_name)
+        letter_ratio = sum(map(str.isalpha, subject_name)) / len(subject_name)
         return letter_ratio > 0.5
     
     def _post_process_missing_fields(self, data: Dict[str, Any], ocr_text: str) -> Dict[str, Any]:
         logger.info("Post-processing missing fields")
-        logger.info(f"OCR text for post-processing: {ocr_text[:200]}..." if ocr_text else "OCR text is empty!")
-        
-        # Extract DOB if missing
-        if not data["candidate_details"]["dob"]:
-            dob_patterns = [
-                r'Date of Birth[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
-                r'DOB[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
-                r'Birth[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
-                r'Born[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
-                r'(\d{1,2}[-/]\d{1,2}[-/]\d{4})\s*(?i:DOB|Birth|Born)',
-            ]
-            
-            for pattern in dob_patterns:
-                match = re.search(pattern, ocr_text)
-                if match:
-                    dob = match.group(1)
-                    dob = re.sub(r'[/]', '-', dob)
-                    data["candidate_details"]["dob"] = dob
-                    logger.info(f"Found DOB: {dob}")
-                    break
-        
-        # Extract registration number if missing
-        if not data["candidate_details"]["registration_no"]:
-            reg_patterns = [
-                r'Registration No[:\s]+([A-Za-z0-9\-\/]+)',
-                r'Reg\. No[:\s]+([A-Za-z0-9\-\/]+)',
-                r'Reg[:\s]+([A-Za-z0-9\-\/]+)',
-                r'Registration[:\s]+([A-Za-z0-9\-\/]+)',
-            ]
-            
-            for pattern in reg_patterns:
-                match = re.search(pattern, ocr_text, re.IGNORECASE)
-                if match:
-                    data["candidate_details"]["registration_no"] = match.group(1).strip()
-                    logger.info(f"Found registration number: {match.group(1)}")
-                    break
-        
-        # Extract issue date if missing
-        if not data["issue_details"]["date"]:
-            date_patterns = [
-                r'Date of Issue[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
-                r'Issue Date[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
-                r'Dated[:\s]+(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
-                r'(\d{1,2}[-/]\d{1,2}[-/]\d{4})\s*(?i:Date|Dated)',
-            ]
+        if ocr_text:
+            logger.debug("OCR text for post-processing: %.200s...", ocr_text)
+        else:
+            logger.info("OCR text is empty!")
+        ocr_lower = ocr_text.lower()
+        
+        for section, field, pattern, keywords, normalize in _MISSING_FIELD_PATTERNS:
+            if data[section][field]:
+                continue
             
-            for pattern in date_patterns:
-                match = re.search(pattern, ocr_text, re.IGNORECASE)
-                if match:
-                    date = match.group(1)
-                    date = re.sub(r'[/]', '-', date)
-                    data["issue_details"]["date"] = date
-                    logger.info(f"Found issue date: {date}")
-                    break
-        
-        # Extract place if missing
-        if not data["issue_details"]["place"]:
-            place_patterns = [
-                r'Place[:\s]+([A-Za-z\s]+)',
-                r'Issued at[:\s]+([A-Za-z\s]+)',
-                r'Place of Issue[:\s]+([A-Za-z\s]+)',
-            ]
+            # Skip the regex when none of the field's labels is in the text
+            if not any(keyword in ocr_lower for keyword in keywords):
+                continue
             
-            for pattern in place_patterns:
-                match = re.search(pattern, ocr_text, re.IGNORECASE)
-                if match:
-                    data["issue_details"]["place"] = match.group(1).strip()
-                    logger.info(f"Found issue place: {match.group(1)}")
-                    break
+            value = _search_fused(pattern, ocr_text)
+            if value is not None:
+                value = normalize(value)
+                data[section][field] = value
+                logger.info(f"Found {field}: {value}")
         
         return data
     
@@ -314,85 +590,66 @@ class MarksheetExtractor:
         logger.info("Adding confidence scores")
         result = {}
         
+        # Every field's context score looks at lowercased text, so lowercase
+        # it once for the whole marksheet; only usable when lowercasing keeps
+        # character offsets, which holds for all but a few non-ASCII letters
+        text_lower = ocr_result["text"].lower()
+        if len(text_lower) == len(ocr_result["text"]):
+            ocr_result = {**ocr_result, "text_lower": text_lower}
+        
+        # Scoring is CPU-only, so it runs inline rather than as a coroutine per field
         # Add confidence to candidate details
-        result["candidate_details"] = {}
-        for field, value in structured_data.get("candidate_details", {}).items():
-            result["candidate_details"][field] = {
-                "value": value,
-                "confidence": await calculate_confidence(
-                    field, 
-                    value, 
-                    ocr_result
-                )
-            }
+        result["candidate_details"] = self._score_fields(
+            structured_data.get("candidate_details", {}), ocr_result
+        )
         
-        # Add confidence to subjects
+        # Add confidence to subjects, dropping those without a name. The
+        # subject dicts are ours, so the score is added to them in place
         result["subjects"] = []
         for subject in structured_data.get("subjects", []):
-            subject_with_confidence = {}
-            for field, value in subject.items():
-                if field != "subject":
-                    subject_with_confidence[field] = value
+            if not subject.get("subject"):
+                continue
             
-            subject_with_confidence["confidence"] = await calculate_confidence(
+            subject["confidence"] = calculate_confidence_sync(
                 "subject", 
-                subject.get("subject", ""),
+                subject["subject"],
                 ocr_result,
-                additional_data=subject_with_confidence
+                additional_data=subject
             )
-            subject_with_confidence["subject"] = subject.get("subject", "")
             
-            result["subjects"].append(subject_with_confidence)
+            result["subjects"].append(subject)
         
-        # Add confidence to overall result
-        result["overall_result"] = {}
-        for field, value in structured_data.get("overall_result", {}).items():
-            result["overall_result"][field] = {
-                "value": value,
-                "confidence": await calculate_confidence(
-                    field, 
-                    value, 
-                    ocr_result
-                )
-            }
+        # Add confidence to overall result and issue details
+        result["overall_result"] = self._score_fields(
+            structured_data.get("overall_result", {}), ocr_result
+        )
+        result["issue_details"] = self._score_fields(
+            structured_data.get("issue_details", {}), ocr_result
+        )
         
-        # Add confidence to issue details
-        result["issue_details"] = {}
-        for field, value in structured_data.get("issue_details", {}).items():
-            result["issue_details"][field] = {
+        return result
+    
+    def _score_fields(self, fields: Dict[str, Any], ocr_result: Dict[str, Any]) -> Dict[str, Any]:
+        # Fields the LLM left empty score 0 without going through the scorer
+        return {
+            field: {
                 "value": value,
-                "confidence": await calculate_confidence(
-                    field, 
-                    value, 
-                    ocr_result
-                )
+                "confidence": calculate_confidence_sync(field, value, ocr_result) if value else 0.0
             }
-        
-        return result
+            for field, value in fields.items()
+        }
     
     def _validate_and_clean_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         logger.info("Validating and cleaning data")
         
-        # Filter out subjects with empty or None subject names
-        valid_subjects = []
-        for subject in data.get("subjects", []):
-            if subject.get("subject"):
-                valid_subjects.append(subject)
-        
-        # Replace subjects with valid ones
-        data["subjects"] = valid_subjects
+        # Subjects with empty or None names are already dropped while scoring
         
         # Ensure all required fields have proper structure
-        for field in ["candidate_details", "overall_result", "issue_details"]:
-            if field not in data:
-                data[field] = {}
+        for field in ("candidate_details", "overall_result", "issue_details"):
+            data.setdefault(field, {})
         
         return data
     
     def _convert_to_response_model(self, data: Dict[str, Any]) -> ExtractionResponse:
-        return ExtractionResponse(
-            candidate_details=CandidateDetails(**data["candidate_details"]),
-            subjects=[SubjectMarks(**subject) for subject in data["subjects"]],
-            overall_result=OverallResult(**data["overall_result"]),
-            issue_details=IssueDetails(**data["issue_details"])
-        )
\ No newline at end of file
+        # Validate the nested sections in one pass through pydantic-core
+        return ExtractionResponse.model_validate(data)
\ No newline at end of file
@@ -1,16 +1,189 @@
 import os
-import json
 import re
 import traceback
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple, Union
 import asyncio
+import copy
+import json
 import google.generativeai as genai
+import orjson
 import logging
 from app.core.config import settings
 from app.core.exceptions import MarksheetExtractionException
+from app.services.cache import ExtractionCache
+from app.utils.rate_limit import AsyncRateLimiter
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the prompt changes so cached extractions are invalidated
+PROMPT_VERSION = "2"
+
+# Patterns for cleaning OCR text and locating JSON in Gemini responses
+_JSON_BLOCK_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+# Special characters that might confuse the LLM
+_UNSUPPORTED_CHARS_RE = re.compile(r'[^\w\s\.\,\-\:\;\(\)\/\%\@\#\$\&\*\+\=\?\!\[\]\{\}\<\>\~\`\|\\]')
+
+def _outermost(text: str, opening: str, closing: str) -> Optional[str]:
+    """
+    Slice from the first opening bracket to the last closing one, like a
+    DOTALL '\\{.*\\}' search but with two C-level scans and no backtracking
+    """
+    start = text.find(opening)
+    end = text.rfind(closing)
+    if start == -1 or end < start:
+        return None
+    return text[start:end + 1]
+
+def _loads_json(json_str: str) -> Any:
+    """
+    Parse JSON with orjson, falling back to the standard library for the
+    NaN/Infinity literals models sometimes emit, which orjson rejects
+    """
+    try:
+        return orjson.loads(json_str)
+    except orjson.JSONDecodeError:
+        return json.loads(json_str)
+
+# Fields _post_process_data converts to numbers, and the subject fields it
+# cleans as text; every other field of the other sections is text
+_SUBJECT_NUMBER_FIELDS = frozenset(("max_marks", "obtained_marks"))
+_SUBJECT_TEXT_FIELDS = frozenset(("subject", "grade"))
+_RESULT_NUMBER_FIELDS = frozenset(("percentage",))
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+# Field descriptions shared by the single and batch extraction prompts
+_PROMPT_FIELDS = """IMPORTANT: The marksheet can be from ANY board or institution with ANY layout.
+        Be flexible in identifying fields. Look for:
+        - Field labels (like "Name:", "Roll No:", "Subject", etc.)
+        - Common patterns (like dates in DD-MM-YYYY or similar formats)
+        - Tabular data for subjects (look for columns with marks/grades)
+        - Positional information (like names at the top, results at the bottom)
+        
+        Extract these fields:
+        
+        1. Candidate details:
+           - name: Full name of the candidate (look for "Name", "Candidate", "Student")
+           - father_name: Father's or mother's name (look for "Father", "Mother", "Parent")
+           - dob: Date of birth (look for "DOB", "Birth", "Date of Birth")
+           - roll_no: Roll number (look for "Roll", "Roll No", "Roll Number")
+           - registration_no: Registration number (look for "Reg", "Registration")
+           - exam_year: Year of examination (look for "Year", "Exam Year")
+           - board: Board or university name (look for "Board", "University")
+           - institution: School or college name (look for "School", "College", "Institution")
+               
+        2. Subject-wise marks:
+           Look for ANY tabular data or list of subjects with marks. Patterns to look for:
+           - Subject names followed by numbers (marks/grades)
+           - Columns with headers like "Subject", "Marks", "Grade", "Score"
+           - Rows containing subject information
+           - Lines like "Mathematics: 85", "Science A1", etc.
+           
+           Extract each subject as an object with:
+           - subject: Name of the subject
+           - max_marks: Maximum marks (if available)
+           - obtained_marks: Marks obtained (if available)
+           - grade: Grade (if available)
+           
+           If marks are presented as "Subject: 85/100", extract:
+           - subject: "Subject", max_marks: 100, obtained_marks: 85, grade: null
+               
+        3. Overall result:
+           - division: Division or class (look for "Division", "Class", "Result")
+           - percentage: Overall percentage (look for "%", "Percentage")
+           - grade: Overall grade (look for "Grade", "Result")
+               
+        4. Issue details:
+           - date: Date of issue (look for "Date", "Issue Date")
+           - place: Place of issue (look for "Place", "Issued at")"""
+
+# JSON layout of one extracted marksheet
+_PROMPT_STRUCTURE = """```json
+        {
+            "candidate_details": {
+                "name": "...",
+                "father_name": "...",
+                "dob": "...",
+                "roll_no": "...",
+                "registration_no": "...",
+                "exam_year": "...",
+                "board": "...",
+                "institution": "..."
+            },
+            "subjects": [
+                {
+                    "subject": "...",
+                    "max_marks": ...,
+                    "obtained_marks": ...,
+                    "grade": "..."
+                },
+                ...
+            ],
+            "overall_result": {
+                "division": "...",
+                "percentage": "...",
+                "grade": "..."
+            },
+            "issue_details": {
+                "date": "...",
+                "place": "..."
+            }
+        }
+        ```"""
+
+# Static instructions that open every prompt. The OCR text goes last so
+# consecutive requests share the longest possible identical prefix, which
+# Gemini's implicit prompt caching can reuse instead of reprocessing
+_SINGLE_PROMPT_PREFIX = f"""
+        You are an expert at extracting structured information from marksheets of any format.
+        I will provide you with text extracted from a marksheet using OCR.
+        Your task is to extract the following information and return it as a JSON object.
+        
+        {_PROMPT_FIELDS}
+        
+        Return the information as a JSON object with the following structure:
+        {_PROMPT_STRUCTURE}
+        
+        If any information is not available, use null for that field.
+        Be flexible with formats and layouts. The marksheet might not follow a standard pattern.
+        Ensure the JSON is valid and properly formatted.
+        """
+
+_BATCH_PROMPT_PREFIX = f"""
+        You are an expert at extracting structured information from marksheets of any format.
+        I will provide you with text extracted from several different marksheets using OCR.
+        Each marksheet starts with a "=== MARKSHEET <n> ===" line. Treat every marksheet independently.
+        For each marksheet, extract the following information.
+        
+        {_PROMPT_FIELDS}
+        
+        Return a JSON array with one object per marksheet, in the same order as the marksheets.
+        Each object must have the following structure:
+        {_PROMPT_STRUCTURE}
+        
+        If any information is not available, use null for that field.
+        Be flexible with formats and layouts. The marksheets might not follow a standard pattern.
+        Ensure the JSON is valid and properly formatted.
+        """
+
+# Markers of transient throttling/availability errors from the Gemini API
+_RETRYABLE_STATUS_CODES = {429, 500, 503}
+_RETRYABLE_MESSAGES = ("429", "quota", "rate limit", "resource exhausted", "resourceexhausted", "unavailable", "overloaded")
+
+def _is_rate_limit(error: Exception) -> bool:
+    """
+    Check whether a Gemini error is transient and worth retrying
+    """
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and code in _RETRYABLE_STATUS_CODES:
+        return True
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in _RETRYABLE_MESSAGES)
+
 class LLMService:
     """
     Service for using LLM (Gemini) to extract structured data from OCR text
@@ -33,15 +206,24 @@ class LLMService:
             ]
             
             self.model = None
+            self.model_name = None
             for model_name in model_names:
                 try:
                     logger.info(f"Trying to initialize model: {model_name}")
                     self.model = genai.GenerativeModel(model_name)
+                    self.model_name = model_name
                     logger.info(f"Gemini model initialized successfully with model: {model_name}")
                     break
                 except Exception as e:
                     logger.warning(f"Failed to initialize model {model_name}: {str(e)}")
             
+            # Throttling state shared by every call made through this service
+            self._semaphore: Optional[asyncio.Semaphore] = None
+            self._limiter = AsyncRateLimiter(settings.GEMINI_RPS)
+            
+            # Results for recently seen OCR text
+            self._response_cache = ExtractionCache(max_entries=settings.LLM_CACHE_SIZE)
+            
             if self.model is None:
                 available_models = [m.name for m in genai.list_models()]
                 logger.error(f"Available models: {available_models}")
@@ -52,6 +234,11 @@ class LLMService:
             logger.error(f"Full traceback: {traceback.format_exc()}")
             raise
     
+    @property
+    def version(self) -> str:
+        """Identifies the model and prompt that produce this service's output"""
+        return f"{self.model_name}:{PROMPT_VERSION}"
+    
     async def extract_structured_data(
         self, 
         ocr_text: str, 
@@ -75,26 +262,39 @@ class LLMService:
             cleaned_text = self._clean_ocr_text(ocr_text)
             logger.info(f"Cleaned OCR text length: {len(cleaned_text)}")
             
+            cache_key, cached = await self._lookup_cached(cleaned_text)
+            if cached is not None:
+                return cached
+            
             # Create prompt
             prompt = self._create_prompt(cleaned_text)
             logger.info("Created prompt for LLM")
-            logger.debug(f"Prompt preview: {prompt[:500]}...")
+            logger.debug("Prompt preview: %.500s...", prompt)
             
             # Generate response
             logger.info("Generating response from Gemini")
             response = await self._generate_response(prompt)
             logger.info("Generated response from Gemini")
-            logger.debug(f"Response preview: {response[:500]}...")
+            logger.debug("Response preview: %.500s...", response)
             
-            # Parse the response
-            structured_data = self._parse_response(response)
+            # Parse the response, giving the model one chance to fix invalid JSON
+            try:
+                structured_data = self._parse_response(response)
+            except MarksheetExtractionException as e:
+                logger.warning(f"Retrying LLM extraction after invalid response: {e.detail}")
+                response = await self._generate_response(
+                    self._create_retry_prompt(prompt, response, str(e.detail))
+                )
+                structured_data = self._parse_response(response)
             logger.info("Parsed LLM response")
-            logger.debug(f"Structured data: {json.dumps(structured_data, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Structured data: %s", orjson.dumps(structured_data).decode())
             
             # Post-process the data
             processed_data = self._post_process_data(structured_data)
             logger.info("Post-processed data")
             
+            await self._store_cached(cache_key, processed_data)
             return processed_data
             
         except Exception as e:
@@ -105,103 +305,131 @@ class LLMService:
                 detail=f"Error during LLM extraction: {str(e)}"
             )
     
-    def _create_prompt(self, ocr_text: str) -> str:
-        return f"""
-        You are an expert at extracting structured information from marksheets of any format.
-        I will provide you with text extracted from a marksheet using OCR.
-        Your task is to extract the following information and return it as a JSON object.
+    async def extract_structured_data_batch(
+        self,
+        ocr_texts: List[str]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Extract structured data from several marksheets with a single LLM call
         
-        IMPORTANT: The marksheet can be from ANY board or institution with ANY layout.
-        Be flexible in identifying fields. Look for:
-        - Field labels (like "Name:", "Roll No:", "Subject", etc.)
-        - Common patterns (like dates in DD-MM-YYYY or similar formats)
-        - Tabular data for subjects (look for columns with marks/grades)
-        - Positional information (like names at the top, results at the bottom)
+        Falls back to one call per marksheet if the combined response can't
+        be matched back to its inputs.
         
-        Extract these fields:
+        Args:
+            ocr_texts: Text extracted from each marksheet
+            
+        Returns:
+            List: Structured data (or the error raised) for each marksheet, in input order
+        """
+        if len(ocr_texts) == 1:
+            return [await self.extract_structured_data(ocr_texts[0])]
         
-        1. Candidate details:
-           - name: Full name of the candidate (look for "Name", "Candidate", "Student")
-           - father_name: Father's or mother's name (look for "Father", "Mother", "Parent")
-           - dob: Date of birth (look for "DOB", "Birth", "Date of Birth")
-           - roll_no: Roll number (look for "Roll", "Roll No", "Roll Number")
-           - registration_no: Registration number (look for "Reg", "Registration")
-           - exam_year: Year of examination (look for "Year", "Exam Year")
-           - board: Board or university name (look for "Board", "University")
-           - institution: School or college name (look for "School", "College", "Institution")
-               
-        2. Subject-wise marks:
-           Look for ANY tabular data or list of subjects with marks. Patterns to look for:
-           - Subject names followed by numbers (marks/grades)
-           - Columns with headers like "Subject", "Marks", "Grade", "Score"
-           - Rows containing subject information
-           - Lines like "Mathematics: 85", "Science A1", etc.
-           
-           Extract each subject as an object with:
-           - subject: Name of the subject
-           - max_marks: Maximum marks (if available)
-           - obtained_marks: Marks obtained (if available)
-           - grade: Grade (if available)
-           
-           If marks are presented as "Subject: 85/100", extract:
-           - subject: "Subject", max_marks: 100, obtained_marks: 85, grade: null
-               
-        3. Overall result:
-           - division: Division or class (look for "Division", "Class", "Result")
-           - percentage: Overall percentage (look for "%", "Percentage")
-           - grade: Overall grade (look for "Grade", "Result")
-               
-        4. Issue details:
-           - date: Date of issue (look for "Date", "Issue Date")
-           - place: Place of issue (look for "Place", "Issued at")
+        # Only marksheets whose text hasn't been seen recently go to Gemini
+        results: List[Any] = [None] * len(ocr_texts)
+        pending = []
+        for index, text in enumerate(ocr_texts):
+            cleaned_text = self._clean_ocr_text(text)
+            cache_key, cached = await self._lookup_cached(cleaned_text)
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.append((index, cleaned_text, cache_key))
+        
+        if len(pending) == 1:
+            index = pending[0][0]
+            results[index] = await self.extract_structured_data(ocr_texts[index])
+            return results
+        
+        if not pending:
+            return results
         
+        try:
+            logger.info(f"Starting batched LLM extraction for {len(pending)} marksheets")
+            
+            prompt = self._create_batch_prompt([cleaned_text for _, cleaned_text, _ in pending])
+            
+            response = await self._generate_response(prompt)
+            logger.info("Generated batched response from Gemini")
+            
+            structured_items = self._parse_batch_response(response, len(pending))
+            for (index, _, cache_key), item in zip(pending, structured_items):
+                results[index] = self._post_process_data(item)
+                await self._store_cached(cache_key, results[index])
+            
+        except Exception as e:
+            logger.warning(f"Batched LLM extraction failed, extracting individually: {str(e)}")
+            extracted = await asyncio.gather(
+                *[self.extract_structured_data(ocr_texts[index]) for index, _, _ in pending],
+                return_exceptions=True
+            )
+            for (index, _, _), result in zip(pending, extracted):
+                results[index] = result
+        
+        return results
+    
+    async def _lookup_cached(self, cleaned_text: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Look up the result of an earlier extraction of the same cleaned OCR text
+        
+        Returns:
+            Tuple: Cache key (None when caching is disabled) and a copy of the cached result, if any
+        """
+        if not self._response_cache.enabled:
+            return None, None
+        
+        cache_key = self._response_cache.make_key(cleaned_text.encode(), self.version)
+        cached = await self._response_cache.get(cache_key)
+        if cached is None:
+            return cache_key, None
+        
+        logger.info("LLM cache hit: %s", cache_key)
+        # Callers fill in and score the result in place, so hand out a copy
+        return cache_key, copy.deepcopy(cached)
+    
+    async def _store_cached(self, cache_key: Optional[str], data: Dict[str, Any]) -> None:
+        if cache_key is not None:
+            # deepcopy keeps values JSON can't round-trip, like NaN and very large integers
+            await self._response_cache.set(cache_key, copy.deepcopy(data))
+    
+    def _create_prompt(self, ocr_text: str) -> str:
+        return f"""{_SINGLE_PROMPT_PREFIX}
         Here is the extracted text from the marksheet:
         ---
         {ocr_text}
         ---
+        """
+    
+    def _create_batch_prompt(self, ocr_texts: List[str]) -> str:
+        marksheets = "\n".join(
+            f"""
+        === MARKSHEET {index} ===
+        {ocr_text}"""
+            for index, ocr_text in enumerate(ocr_texts, start=1)
+        )
+        return f"""{_BATCH_PROMPT_PREFIX}
+        Here is the extracted text from the {len(ocr_texts)} marksheets; return exactly {len(ocr_texts)} objects:
+        {marksheets}
+        """
+    
+    def _create_retry_prompt(self, prompt: str, response: str, error: str) -> str:
+        """
+        Create a follow-up prompt asking the LLM to correct an unparseable response
+        """
+        return f"""
+        {prompt}
         
-        Extract the information and return it as a JSON object with the following structure:
-        ```json
-        {{
-            "candidate_details": {{
-                "name": "...",
-                "father_name": "...",
-                "dob": "...",
-                "roll_no": "...",
-                "registration_no": "...",
-                "exam_year": "...",
-                "board": "...",
-                "institution": "..."
-            }},
-            "subjects": [
-                {{
-                    "subject": "...",
-                    "max_marks": ...,
-                    "obtained_marks": ...,
-                    "grade": "..."
-                }},
-                ...
-            ],
-            "overall_result": {{
-                "division": "...",
-                "percentage": "...",
-                "grade": "..."
-            }},
-            "issue_details": {{
-                "date": "...",
-                "place": "..."
-            }}
-        }}
-        ```
+        Your previous response could not be used:
+        {response[:2000]}
         
-        If any information is not available, use null for that field.
-        Be flexible with formats and layouts. The marksheet might not follow a standard pattern.
-        Ensure the JSON is valid and properly formatted.
+        Error: {error}
+        
+        Return only the corrected JSON object.
         """
     
     async def _generate_response(self, prompt: str) -> str:
         """
-        Generate a response from the LLM
+        Generate a response from the LLM, retrying transient rate-limit errors
+        with exponential backoff
         
         Args:
             prompt: Prompt for the LLM
@@ -209,12 +437,29 @@ class LLMService:
         Returns:
             str: Response from the LLM
         """
+        # Created lazily so the semaphore binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+        
+        attempts = max(1, settings.GEMINI_MAX_RETRIES)
         try:
-            logger.info("Generating content from Gemini")
-            # Generate content
-            response = self.model.generate_content(prompt)
-            logger.info("Generated content successfully")
-            return response.text
+            for attempt in range(1, attempts + 1):
+                try:
+                    async with self._semaphore, self._limiter:
+                        logger.info("Generating content from Gemini")
+                        # Generate content without blocking the event loop
+                        response = await self.model.generate_content_async(prompt)
+                    logger.info("Generated content successfully")
+                    return response.text
+                except Exception as e:
+                    if attempt == attempts or not _is_rate_limit(e):
+                        raise
+                    delay = min(
+                        settings.GEMINI_RETRY_MAX_WAIT,
+                        settings.GEMINI_RETRY_MIN_WAIT * 2 ** (attempt - 1)
+                    )
+                    logger.warning(f"Gemini call throttled ({str(e)}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
         except Exception as e:
             logger.error(f"Error generating LLM response: {str(e)}")
             logger.error(f"Full traceback: {traceback.format_exc()}")
@@ -237,16 +482,15 @@ class LLMService:
             logger.info("Parsing LLM response")
             # Extract JSON from the response
             # The response might contain markdown code blocks or other text
-            json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
+            json_match = _JSON_BLOCK_RE.search(response)
             
             if json_match:
                 json_str = json_match.group(1)
                 logger.info("Found JSON in code block")
             else:
                 # If no code block, try to find a JSON object directly
-                json_match = re.search(r'\{.*\}', response, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(0)
+                json_str = _outermost(response, "{", "}")
+                if json_str is not None:
                     logger.info("Found JSON directly in response")
                 else:
                     # If no JSON found, return empty structure
@@ -254,17 +498,47 @@ class LLMService:
                     return self._get_empty_structure()
             
             # Parse JSON
-            data = json.loads(json_str)
+            data = _loads_json(json_str)
             logger.info("Successfully parsed JSON")
             return data
         except json.JSONDecodeError as e:
             logger.error(f"Error parsing LLM response as JSON: {str(e)}")
-            logger.error(f"Response was: {response}")
+            logger.error("Response was: %s", response)
             raise MarksheetExtractionException(
                 status_code=500,
                 detail=f"Error parsing LLM response as JSON: {str(e)}"
             )
     
+    def _parse_batch_response(self, response: str, expected_count: int) -> List[Dict[str, Any]]:
+        """
+        Parse a batched LLM response into one structured result per marksheet
+        
+        Args:
+            response: Response from the LLM
+            expected_count: Number of marksheets in the prompt
+            
+        Returns:
+            List[Dict]: Structured data for each marksheet
+            
+        Raises:
+            ValueError: If the response is not a JSON array of the expected length
+        """
+        json_match = _JSON_BLOCK_RE.search(response)
+        if json_match:
+            json_str = json_match.group(1)
+        else:
+            json_str = _outermost(response, "[", "]")
+            if json_str is None:
+                raise ValueError("No JSON array found in batched response")
+        
+        data = _loads_json(json_str)
+        if not isinstance(data, list) or len(data) != expected_count:
+            raise ValueError(f"Expected a JSON array of {expected_count} results")
+        if not all(isinstance(item, dict) for item in data):
+            raise ValueError("Batched response contains non-object results")
+        
+        return data
+    
     def _get_empty_structure(self) -> Dict[str, Any]:
         """
         Get an empty structure for the extracted data
@@ -305,18 +579,31 @@ class LLMService:
         Returns:
             str: Cleaned text
         """
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove special characters that might confuse the LLM
-        text = re.sub(r'[^\w\s\.\,\-\:\;\(\)\/\%\@\#\$\&\*\+\=\?\!\[\]\{\}\<\>\~\`\|\\]', '', text)
-        
         # Limit text length to avoid token limits
         max_chars = 8000  # Adjust based on model's context window
-        if len(text) > max_chars:
-            text = text[:max_chars] + "..."
         
-        return text
+        # Cleaning only shrinks text, so clean a prefix of the raw text and
+        # widen it until it yields more than max_chars or covers everything;
+        # long multi-page OCR output is never cleaned past what's kept
+        window = max_chars * 2
+        while True:
+            cleaned = self._clean_ocr_chunk(text[:window])
+            if len(cleaned) > max_chars or window >= len(text):
+                break
+            window *= 2
+        
+        if len(cleaned) > max_chars:
+            cleaned = cleaned[:max_chars] + "..."
+        
+        return cleaned
+    
+    def _clean_ocr_chunk(self, text: str) -> str:
+        # Remove extra whitespace; str.split() collapses runs in C, much
+        # faster than a regex substitution over the whole text
+        text = ' '.join(text.split())
+        
+        # Remove special characters that might confuse the LLM
+        return _UNSUPPORTED_CHARS_RE.sub('', text)
     
     def _post_process_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -331,49 +618,43 @@ class LLMService:
         logger.info("Post-processing data")
         
         # Process candidate details
-        for field in data.get("candidate_details", {}):
-            if data["candidate_details"][field]:
-                data["candidate_details"][field] = self._clean_field_value(
-                    data["candidate_details"][field]
-                )
+        self._normalize_fields(data.get("candidate_details", {}))
         
         # Process subjects
         for subject in data.get("subjects", []):
-            for field in subject:
-                if field in ["max_marks", "obtained_marks"] and subject[field]:
-                    # Convert marks to numbers
-                    try:
-                        subject[field] = float(subject[field])
-                    except (ValueError, TypeError):
-                        subject[field] = None
-                elif field == "grade" and subject[field]:
-                    subject[field] = self._clean_field_value(subject[field])
-                elif field == "subject" and subject[field]:
-                    subject[field] = self._clean_field_value(subject[field])
+            self._normalize_fields(subject, _SUBJECT_NUMBER_FIELDS, _SUBJECT_TEXT_FIELDS)
         
         # Process overall result
-        for field in data.get("overall_result", {}):
-            if data["overall_result"][field]:
-                if field == "percentage":
-                    try:
-                        data["overall_result"][field] = float(data["overall_result"][field])
-                    except (ValueError, TypeError):
-                        data["overall_result"][field] = None
-                else:
-                    data["overall_result"][field] = self._clean_field_value(
-                        data["overall_result"][field]
-                    )
+        self._normalize_fields(data.get("overall_result", {}), _RESULT_NUMBER_FIELDS)
         
         # Process issue details
-        for field in data.get("issue_details", {}):
-            if data["issue_details"][field]:
-                data["issue_details"][field] = self._clean_field_value(
-                    data["issue_details"][field]
-                )
+        self._normalize_fields(data.get("issue_details", {}))
         
         logger.info("Post-processing completed")
         return data
     
+    def _normalize_fields(
+        self,
+        fields: Dict[str, Any],
+        number_fields: FrozenSet[str] = frozenset(),
+        text_fields: Optional[FrozenSet[str]] = None
+    ) -> None:
+        """
+        Normalize the non-empty values of one section in place
+        
+        Args:
+            fields: Field values of the section
+            number_fields: Fields converted to numbers (None if unparseable)
+            text_fields: Fields cleaned as text; None cleans every other field
+        """
+        for field, value in fields.items():
+            if not value:
+                continue
+            if field in number_fields:
+                fields[field] = _to_float(value)
+            elif text_fields is None or field in text_fields:
+                fields[field] = self._clean_field_value(value)
+    
     def _clean_field_value(self, value: str) -> str:
         """
         Clean a field value
@@ -388,11 +669,10 @@ class LLMService:
             return value
         
         # Remove extra whitespace
-        value = re.sub(r'\s+', ' ', value).strip()
+        value = ' '.join(value.split())
         
         # Remove quotes if they surround the entire value
-        if (value.startswith('"') and value.endswith('"')) or \
-           (value.startswith("'") and value.endswith("'")):
+        if value[:1] in ('"', "'") and value[-1:] == value[:1]:
             value = value[1:-1].strip()
         
         return value
\ No newline at end of file
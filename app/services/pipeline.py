@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input
+_DONE = object()
+
+async def iter_pipeline(
+    items: List[Any],
+    load: Callable[[Any], Awaitable[Any]],
+    ocr: Callable[[Any], Awaitable[Any]],
+    llm_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+    lookup: Optional[Callable[[Any], Awaitable[Optional[Any]]]] = None,
+    ocr_workers: int = 4,
+    max_batch_size: int = 8,
+    max_wait_time: float = 0.1,
+    queue_size: int = 16
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Run items through load -> OCR -> LLM stages connected by bounded queues,
+    so one file's OCR overlaps with another file's LLM call
+    
+    Args:
+        items: Inputs to process
+        load: Stage A, turns an input into loaded data
+        ocr: Stage B, runs OCR on loaded data
+        llm_batch: Stage C, turns a list of OCR results into one result (or
+            exception) per OCR result, in the same order
+        lookup: Optional check run after loading; a non-None value is used as
+            the item's result and the later stages are skipped
+        ocr_workers: Number of concurrent OCR workers
+        max_batch_size: Largest number of OCR results sent to one LLM call
+        max_wait_time: Seconds stage C waits for a batch to fill up
+        queue_size: Capacity of each queue between stages
+        
+    Yields:
+        Tuple: Input index and result (or the exception raised), in completion order
+    """
+    ocr_workers = max(1, ocr_workers)
+    ocr_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    llm_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    output_queue: asyncio.Queue = asyncio.Queue()
+    
+    async def load_stage() -> None:
+        for index, item in enumerate(items):
+            try:
+                loaded = await load(item)
+                cached = await lookup(loaded) if lookup is not None else None
+                if cached is not None:
+                    output_queue.put_nowait((index, cached))
+                    continue
+                await ocr_queue.put((index, loaded))
+            except Exception as e:
+                output_queue.put_nowait((index, e))
+        for _ in range(ocr_workers):
+            await ocr_queue.put(_DONE)
+    
+    async def ocr_stage() -> None:
+        while True:
+            entry = await ocr_queue.get()
+            if entry is _DONE:
+                return
+            index, loaded = entry
+            try:
+                await llm_queue.put((index, await ocr(loaded)))
+            except Exception as e:
+                output_queue.put_nowait((index, e))
+    
+    async def run_llm_batch(batch: List[Tuple[int, Any]]) -> None:
+        logger.info(f"Dispatching LLM batch of {len(batch)} items")
+        try:
+            outputs = await llm_batch([ocr_result for _, ocr_result in batch])
+        except Exception as e:
+            outputs = [e] * len(batch)
+        for (index, _), output in zip(batch, outputs):
+            output_queue.put_nowait((index, output))
+    
+    async def llm_stage() -> None:
+        loop = asyncio.get_running_loop()
+        inflight = []
+        finished = False
+        try:
+            while not finished:
+                entry = await llm_queue.get()
+                if entry is _DONE:
+                    break
+                batch = [entry]
+                deadline = loop.time() + max_wait_time
+                
+                # Dispatch on a full batch or when the wait expires
+                while len(batch) < max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        entry = await asyncio.wait_for(llm_queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if entry is _DONE:
+                        finished = True
+                        break
+                    batch.append(entry)
+                
+                inflight.append(asyncio.create_task(run_llm_batch(batch)))
+            
+            await asyncio.gather(*inflight)
+        finally:
+            for task in inflight:
+                task.cancel()
+    
+    async def run_stages() -> None:
+        workers = [asyncio.create_task(ocr_stage()) for _ in range(ocr_workers)]
+        
+        async def close_ocr_stage() -> None:
+            await asyncio.gather(*workers)
+            await llm_queue.put(_DONE)
+        
+        try:
+            await asyncio.gather(load_stage(), close_ocr_stage(), llm_stage())
+        finally:
+            for worker in workers:
+                worker.cancel()
+    
+    stages = asyncio.create_task(run_stages())
+    try:
+        for _ in range(len(items)):
+            yield await output_queue.get()
+        await stages
+    finally:
+        # Stop the stages if the consumer goes away early (e.g. a client disconnect)
+        if not stages.done():
+            stages.cancel()
+
+async def run_pipeline(items: List[Any], *args: Any, **kwargs: Any) -> List[Any]:
+    """
+    Run iter_pipeline to completion
+    
+    Returns:
+        List: Result (or the exception raised) for each item, in input order
+    """
+    results: List[Any] = [None] * len(items)
+    async for index, result in iter_pipeline(items, *args, **kwargs):
+        results[index] = result
+    return results
@@ -1,9 +1,15 @@
 import pytest
+import asyncio
+import contextlib
 import os
 import json
+from types import SimpleNamespace
+from pydantic import ValidationError
 from fastapi.testclient import TestClient
 from fastapi import status
 from app.main import app
+from app.api import routes
+from app.core.config import settings
 
 client = TestClient(app)
 
@@ -20,6 +26,10 @@ def test_health_check():
     assert response.status_code == status.HTTP_200_OK
     assert response.json()["status"] == "healthy"
 
+def test_request_id_is_echoed():
+    response = client.get("/health", headers={"X-Request-ID": "abc123"})
+    assert response.headers["X-Request-ID"] == "abc123"
+
 def test_extract_valid_image(sample_image_path):
     with open(sample_image_path, "rb") as f:
         response = client.post("/api/v1/extract", files={"file": ("sample.jpg", f, "image/jpeg")})
@@ -97,12 +107,13 @@ def test_extract_large_file():
     assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
 
 def test_batch_extract(sample_image_path, sample_pdf_path):
-    files = [
-        ("files", ("sample.jpg", open(sample_image_path, "rb"), "image/jpeg")),
-        ("files", ("sample.pdf", open(sample_pdf_path, "rb"), "application/pdf"))
-    ]
-    
-    response = client.post("/api/v1/batch-extract", files=files)
+    with contextlib.ExitStack() as stack:
+        files = [
+            ("files", ("sample.jpg", stack.enter_context(open(sample_image_path, "rb")), "image/jpeg")),
+            ("files", ("sample.pdf", stack.enter_context(open(sample_pdf_path, "rb")), "application/pdf"))
+        ]
+        
+        response = client.post("/api/v1/batch-extract", files=files)
     
     assert response.status_code == status.HTTP_200_OK
     
@@ -120,8 +131,63 @@ def test_batch_extract(sample_image_path, sample_pdf_path):
 
 def test_batch_extract_too_many_files(sample_image_path):
     # Create 11 files (exceeds MAX_BATCH_SIZE of 10)
-    files = [("files", (f"sample{i}.jpg", open(sample_image_path, "rb"), "image/jpeg")) for i in range(11)]
+    with contextlib.ExitStack() as stack:
+        files = [
+            ("files", (f"sample{i}.jpg", stack.enter_context(open(sample_image_path, "rb")), "image/jpeg"))
+            for i in range(11)
+        ]
+        
+        response = client.post("/api/v1/batch-extract", files=files)
+    
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_batch_extract_too_many_in_memory_files():
+    files = [("files", (f"sample{i}.png", b"\x89PNG\r\n\x1a\n", "image/png")) for i in range(11)]
     
     response = client.post("/api/v1/batch-extract", files=files)
     
-    assert response.status_code == status.HTTP_400_BAD_REQUEST
\ No newline at end of file
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_batch_extract_stream_too_many_files():
+    files = [("files", (f"sample{i}.png", b"\x89PNG\r\n\x1a\n", "image/png")) for i in range(11)]
+    
+    response = client.post("/api/v1/batch-extract-stream", files=files)
+    
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_diagnostic_endpoints_hidden_without_debug():
+    assert client.get("/test-models").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/test-gemini").status_code == status.HTTP_404_NOT_FOUND
+
+def test_batch_ocr_concurrency_does_not_depend_on_process_pool(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_WORKERS", 0)
+    monkeypatch.setattr(settings, "OCR_CONCURRENCY", 3)
+    captured = {}
+    monkeypatch.setattr(routes, "iter_pipeline", lambda files, **kwargs: captured.update(kwargs))
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(extractor=object())))
+    
+    routes._iter_batch(request, [])
+    
+    assert captured["ocr_workers"] == 3
+
+def _result_dict(confidence):
+    field = {"value": "X", "confidence": 0.9}
+    return {
+        "candidate_details": {name: field for name in (
+            "name", "father_name", "dob", "roll_no", "registration_no", "exam_year", "board", "institution"
+        )},
+        "subjects": [{"subject": "Science", "obtained_marks": 78, "confidence": confidence}],
+        "overall_result": {"division": field},
+        "issue_details": {}
+    }
+
+def test_responses_outside_a_response_model_are_validated():
+    async def build(result_dict, validate):
+        return await routes._build_response(result_dict, 0.0, "image/png", 10, None, validate)
+    
+    assert asyncio.run(build(_result_dict(0.9), True)).subjects[0].confidence == 0.9
+    
+    # Out-of-range confidence is caught when the route's response_model won't see it
+    with pytest.raises(ValidationError):
+        asyncio.run(build(_result_dict(2.0), True))
+    asyncio.run(build(_result_dict(2.0), False))
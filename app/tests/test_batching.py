@@ -0,0 +1,41 @@
+import asyncio
+from app.services.batching import AsyncBatchQueue
+
+def test_concurrent_submissions_share_a_batch():
+    batches = []
+    
+    async def process(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+    
+    async def run():
+        queue = AsyncBatchQueue(process, max_batch_size=4, max_wait_time=0.05)
+        queue.start()
+        try:
+            return await asyncio.gather(*[queue.submit(i) for i in range(6)])
+        finally:
+            await queue.stop()
+    
+    results = asyncio.run(run())
+    
+    assert results == [0, 2, 4, 6, 8, 10]
+    assert [len(batch) for batch in batches] == [4, 2]
+
+def test_item_errors_are_raised_to_their_caller():
+    async def process(items):
+        return [ValueError("bad") if item == "bad" else item for item in items]
+    
+    async def run():
+        queue = AsyncBatchQueue(process, max_batch_size=4, max_wait_time=0.05)
+        queue.start()
+        try:
+            return await asyncio.gather(
+                queue.submit("good"), queue.submit("bad"), return_exceptions=True
+            )
+        finally:
+            await queue.stop()
+    
+    good, bad = asyncio.run(run())
+    
+    assert good == "good"
+    assert isinstance(bad, ValueError)
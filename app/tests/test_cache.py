@@ -0,0 +1,41 @@
+import pytest
+from app.services.cache import ExtractionCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(str(tmp_path / "cache"))
+
+def test_cache_disabled_without_directory():
+    assert not ExtractionCache("").enabled
+
+def test_make_key_depends_on_content_and_version(cache):
+    key = cache.make_key(b"marksheet", "gemini-1.5-flash:1")
+    
+    assert key == cache.make_key(b"marksheet", "gemini-1.5-flash:1")
+    assert key != cache.make_key(b"other marksheet", "gemini-1.5-flash:1")
+    assert key != cache.make_key(b"marksheet", "gemini-1.5-flash:2")
+
+@pytest.mark.asyncio
+async def test_cache_round_trip(cache):
+    key = cache.make_key(b"marksheet", "gemini-1.5-flash:1")
+    
+    assert await cache.get(key) is None
+    
+    await cache.set(key, {"subjects": [], "processing_time": 1.5})
+    
+    assert await cache.get(key) == {"subjects": [], "processing_time": 1.5}
+
+@pytest.mark.asyncio
+async def test_memory_cache_evicts_least_recently_used():
+    cache = ExtractionCache(max_entries=2)
+    
+    assert cache.enabled
+    
+    await cache.set("a", {"n": 1})
+    await cache.set("b", {"n": 2})
+    assert await cache.get("a") == {"n": 1}
+    await cache.set("c", {"n": 3})
+    
+    assert await cache.get("b") is None
+    assert await cache.get("a") == {"n": 1}
+    assert await cache.get("c") == {"n": 3}
@@ -0,0 +1,36 @@
+import pytest
+from app.utils.confidence import _validate_field, calculate_confidence_sync
+
+@pytest.mark.parametrize("field_name, field_value, expected", [
+    ("name", "Rahul Kumar", 0.95),
+    ("father_name", "rahul kumar", 0.8),
+    ("dob", "12/05/2004", 0.95),
+    ("date", "32/13/2004", 0.2),
+    ("roll_no", "A123/45", 0.9),
+    ("exam_year", "1975", 0.3),
+    ("board", "cbse", 0.5),
+    ("place", "Delhi", 0.9),
+    ("obtained_marks", "abc", 0.1),
+    ("percentage", "101", 0.5),
+    ("percentage", 87.5, 0.95),
+    ("max_marks", 1200, 0.7),
+    ("division", "First", 0.95),
+    ("remarks", "Passed", 0.7),
+    ("name", "", 0.0),
+])
+def test_validate_field(field_name, field_value, expected):
+    assert _validate_field(field_name, field_value) == expected
+
+def test_precomputed_lowercase_text_scores_the_same():
+    text = "Name of Candidate: RAHUL KUMAR\nFather's Name: SURESH KUMAR\nRoll No: F06931"
+    with_lower = {"text": text, "text_lower": text.lower()}
+    
+    for field_name, field_value in [("name", "RAHUL KUMAR"), ("father_name", "SURESH KUMAR"), ("roll_no", "F06931")]:
+        assert calculate_confidence_sync(field_name, field_value, with_lower) == \
+            calculate_confidence_sync(field_name, field_value, {"text": text})
+
+def test_numeric_values_are_scored_against_the_text():
+    text = "RESULT\nDivision: First Division\nPercentage: 90.0%"
+    
+    assert calculate_confidence_sync("percentage", 90.0, {"text": text}) == \
+        calculate_confidence_sync("percentage", "90.0", {"text": text})
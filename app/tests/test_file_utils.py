@@ -0,0 +1,80 @@
+import asyncio
+import io
+import os
+import time
+import pytest
+from fastapi import UploadFile
+from app.core.config import settings
+from app.utils.file_utils import (
+    detect_file_type,
+    cleanup_stale_temp_files,
+    temp_upload_file,
+    ensure_temp_dir,
+    write_upload_file,
+    TEMP_FILE_PREFIX
+)
+
+@pytest.mark.parametrize("header, expected", [
+    (b"%PDF-1.7\n%\xe2\xe3", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n\x00\x00\x00\r", "image/png"),
+    (b"\xff\xd8\xff\xe0\x00\x10JFIF\x00", "image/jpeg"),
+    (b"RIFF\x24\x00\x00\x00WEBPVP8 ", "image/webp"),
+    (b"RIFF\x24\x00\x00\x00WAVEfmt ", None),
+    (b"This is a text file", None),
+    (b"", None),
+])
+def test_detect_file_type(header, expected):
+    assert detect_file_type(header) == expected
+
+def test_cleanup_stale_temp_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TEMP_DIR", str(tmp_path))
+    stale = tmp_path / f"{TEMP_FILE_PREFIX}old.png"
+    fresh = tmp_path / f"{TEMP_FILE_PREFIX}new.png"
+    other = tmp_path / "unrelated.png"
+    for path in (stale, fresh, other):
+        path.write_bytes(b"data")
+    old_time = time.time() - 7200
+    os.utime(stale, (old_time, old_time))
+    os.utime(other, (old_time, old_time))
+    
+    assert cleanup_stale_temp_files(3600) == 1
+    assert not stale.exists()
+    assert fresh.exists()
+    assert other.exists()
+
+def test_temp_upload_file_is_removed_on_exit(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TEMP_DIR", str(tmp_path))
+    upload = UploadFile(file=io.BytesIO(b"%PDF-1.7 body"), filename="../../evil.pdf")
+    
+    async def run():
+        async with temp_upload_file("application/pdf") as temp_file:
+            written = await write_upload_file(upload, temp_file)
+            with open(temp_file.name, "rb") as f:
+                assert f.read() == b"%PDF-1.7 body"
+            return written, temp_file.name
+    
+    written, name = asyncio.run(run())
+    
+    assert written == 13
+    assert os.path.dirname(name) == str(tmp_path)
+    assert os.path.basename(name).startswith(TEMP_FILE_PREFIX)
+    assert name.endswith(".pdf")
+    assert not os.path.exists(name)
+
+def test_temp_dir_is_created_once(tmp_path, monkeypatch):
+    temp_dir = tmp_path / "uploads"
+    monkeypatch.setattr(settings, "TEMP_DIR", str(temp_dir))
+    calls = []
+    real_makedirs = os.makedirs
+    
+    def counting_makedirs(*args, **kwargs):
+        calls.append(args)
+        real_makedirs(*args, **kwargs)
+    
+    monkeypatch.setattr(os, "makedirs", counting_makedirs)
+    
+    ensure_temp_dir()
+    ensure_temp_dir()
+    
+    assert temp_dir.is_dir()
+    assert len(calls) == 1
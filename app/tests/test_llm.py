@@ -0,0 +1,88 @@
+import math
+import asyncio
+from types import SimpleNamespace
+from app.services.cache import ExtractionCache
+from app.services.llm import LLMService
+from app.utils.rate_limit import AsyncRateLimiter
+
+def test_generate_response_overlaps_calls():
+    # Bypass __init__, which needs a real Gemini API key
+    service = LLMService.__new__(LLMService)
+    service._semaphore = None
+    service._limiter = AsyncRateLimiter(0)
+    active = 0
+    peak = 0
+    
+    class FakeModel:
+        async def generate_content_async(self, prompt):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            return SimpleNamespace(text=f"response to {prompt}")
+    
+    service.model = FakeModel()
+    
+    async def run():
+        return await asyncio.gather(*[
+            service._generate_response(f"prompt {i}") for i in range(3)
+        ])
+    
+    responses = asyncio.run(run())
+    
+    assert responses == [f"response to prompt {i}" for i in range(3)]
+    assert peak == 3
+
+def test_repeated_ocr_text_skips_gemini():
+    service = LLMService.__new__(LLMService)
+    service._semaphore = None
+    service._limiter = AsyncRateLimiter(0)
+    service._response_cache = ExtractionCache(max_entries=8)
+    service.model_name = "test-model"
+    calls = 0
+    
+    class FakeModel:
+        async def generate_content_async(self, prompt):
+            nonlocal calls
+            calls += 1
+            return SimpleNamespace(text='{"candidate_details": {"name": "Rahul Kumar"}, "subjects": []}')
+    
+    service.model = FakeModel()
+    
+    async def run():
+        first = await service.extract_structured_data("Name: Rahul Kumar")
+        # Callers mutate results in place; that must not leak into the cache
+        first["subjects"].append({"subject": "Science"})
+        second = await service.extract_structured_data("Name:   Rahul Kumar\n")
+        return first, second
+    
+    first, second = asyncio.run(run())
+    
+    assert calls == 1
+    assert second["candidate_details"]["name"] == "Rahul Kumar"
+    assert second["subjects"] == []
+
+def test_parse_response_accepts_nan_literals():
+    service = LLMService.__new__(LLMService)
+    
+    data = service._parse_response('```json\n{"overall_result": {"percentage": NaN}}\n```')
+    
+    assert math.isnan(data["overall_result"]["percentage"])
+
+def test_cached_results_keep_values_json_cannot_round_trip():
+    service = LLMService.__new__(LLMService)
+    service._response_cache = ExtractionCache(max_entries=8)
+    service.model_name = "test-model"
+    data = {"overall_result": {"percentage": float("nan")}, "roll_no": 2 ** 70}
+    
+    async def run():
+        cache_key, _ = await service._lookup_cached("Roll No: 1")
+        await service._store_cached(cache_key, data)
+        return await service._lookup_cached("Roll No: 1")
+    
+    _, cached = asyncio.run(run())
+    
+    assert math.isnan(cached["overall_result"]["percentage"])
+    assert cached["roll_no"] == 2 ** 70
+    assert cached is not data
@@ -0,0 +1,39 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.core.config import Settings
+from app.core.middleware import MaxRequestSizeMiddleware
+
+app = FastAPI()
+app.add_middleware(MaxRequestSizeMiddleware, max_size=16)
+
+@app.post("/echo")
+async def echo(request: Request):
+    return {"size": len(await request.body())}
+
+client = TestClient(app)
+
+def test_small_body_passes():
+    response = client.post("/echo", content=b"x" * 16)
+    assert response.status_code == 200
+    assert response.json()["size"] == 16
+
+def test_declared_oversize_body_is_rejected():
+    response = client.post("/echo", content=b"x" * 17)
+    assert response.status_code == 413
+
+def test_undeclared_oversize_body_is_rejected():
+    def chunks():
+        yield b"x" * 10
+        yield b"x" * 10
+    
+    response = client.post("/echo", content=chunks())
+    assert response.status_code == 413
+
+def test_request_size_limit_follows_configured_file_and_batch_limits(monkeypatch):
+    monkeypatch.setenv("MAX_FILE_SIZE", str(20 * 1024 * 1024))
+    monkeypatch.setenv("MAX_BATCH_SIZE", "20")
+    assert Settings().MAX_REQUEST_SIZE == 20 * 20 * 1024 * 1024 + 1024 * 1024
+    
+    # An explicit limit is kept as configured
+    monkeypatch.setenv("MAX_REQUEST_SIZE", "4096")
+    assert Settings().MAX_REQUEST_SIZE == 4096
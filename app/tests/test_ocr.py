@@ -0,0 +1,192 @@
+import asyncio
+import io
+import time
+import fitz
+import numpy as np
+import pytest
+from PIL import Image
+from app.core.config import settings
+from app.core.exceptions import MarksheetExtractionException
+from app.services import ocr
+from app.services.ocr import OCRService
+
+def test_ocr_concurrency_is_bounded(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_CONCURRENCY", 2)
+    service = OCRService()
+    active = 0
+    peak = 0
+    
+    def fake_ocr(data, content_type):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        time.sleep(0.05)
+        active -= 1
+        return {"text": "", "metadata": {}}
+    
+    monkeypatch.setattr(service, "extract_text_from_bytes_blocking", fake_ocr)
+    
+    async def run():
+        await asyncio.gather(*[
+            service.extract_text_from_bytes(b"data", "image/png") for _ in range(6)
+        ])
+    
+    asyncio.run(run())
+    
+    assert peak == 2
+
+def test_extract_text_failure_raises_extraction_error(tmp_path):
+    service = OCRService()
+    
+    with pytest.raises(MarksheetExtractionException) as exc_info:
+        asyncio.run(service.extract_text(str(tmp_path / "marksheet.txt")))
+    
+    assert exc_info.value.status_code == 500
+
+def test_to_grayscale_handles_image_modes():
+    service = OCRService()
+    image = Image.new("RGB", (40, 30), (200, 120, 40))
+    
+    for mode in ("RGB", "RGBA", "L", "P", "CMYK"):
+        gray = service._to_grayscale(image.convert(mode))
+        assert gray.shape == (30, 40)
+        assert gray.dtype == np.uint8
+
+def test_large_scans_are_downscaled(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_MAX_IMAGE_SIDE", 100)
+    service = OCRService()
+    
+    assert service._downscale(np.zeros((400, 200), np.uint8)).shape == (100, 50)
+    assert service._downscale(np.zeros((80, 60), np.uint8)).shape == (80, 60)
+
+def test_scanned_pdf_pages_are_rendered_grayscale_and_downscaled(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_MAX_IMAGE_SIDE", 100)
+    document = fitz.open()
+    image = io.BytesIO()
+    Image.new("RGB", (400, 200), (255, 255, 255)).save(image, format="PNG")
+    document.new_page(width=400, height=200).insert_image(fitz.Rect(0, 0, 400, 200), stream=image.getvalue())
+    document.new_page(width=400, height=200)
+    
+    service = OCRService()
+    shapes = []
+    
+    def fake_ocr(image):
+        shapes.append(image.shape)
+        return "text"
+    
+    monkeypatch.setattr(service, "_ocr_image", fake_ocr)
+    result = asyncio.run(service._extract_from_pdf(document.tobytes()))
+    
+    # Only the page with an image is rendered
+    assert shapes == [(50, 100)]
+    assert result["metadata"]["images_extracted"] == 1
+
+def test_recognize_words_reuses_thread_engine(monkeypatch):
+    calls = []
+    
+    class FakeEngine:
+        def SetPageSegMode(self, psm):
+            calls.append(psm)
+        
+        def SetImage(self, image):
+            calls.append("image")
+        
+        def SetImageBytes(self, pixels, width, height, bytes_per_pixel, bytes_per_line):
+            calls.append((len(pixels), width, height, bytes_per_pixel, bytes_per_line))
+        
+        def MapWordConfidences(self):
+            return [("Science", 91), ("78", 88)]
+    
+    monkeypatch.setattr(ocr._tess_local, "api", FakeEngine(), raising=False)
+    service = OCRService()
+    image = Image.new("L", (40, 30), 255)
+    
+    assert service._recognize_words(image, 6) == (["Science", "78"], [91, 88])
+    assert service._recognize_words(np.zeros((30, 40), np.uint8), 3) == (["Science", "78"], [91, 88])
+    assert calls == [6, "image", 3, (1200, 40, 30, 1, 40)]
+
+def test_scanned_pdf_images_are_ocred_in_page_order(monkeypatch):
+    document = fitz.open()
+    for shade in (0, 128, 255):
+        image = io.BytesIO()
+        Image.new("L", (20, 20), shade).save(image, format="PNG")
+        document.new_page().insert_image(fitz.Rect(0, 0, 20, 20), stream=image.getvalue())
+    pdf_bytes = document.tobytes()
+    
+    service = OCRService()
+    
+    def fake_ocr(image):
+        # Finish the later pages first
+        shade = int(image[0, 0])
+        time.sleep(0.01 * (255 - shade) / 128)
+        return f"shade {shade}"
+    
+    monkeypatch.setattr(service, "_ocr_image", fake_ocr)
+    
+    result = asyncio.run(service._extract_from_pdf(pdf_bytes))
+    
+    assert result["text"] == "\n\n".join(
+        f"Page {page}:\nshade {shade}" for page, shade in ((1, 0), (2, 128), (3, 255))
+    )
+
+def test_image_preprocessing_variants_keep_best_text(monkeypatch):
+    service = OCRService()
+    texts = iter(["Name", "Name: Rahul Kumar Roll No 123456 Subject Marks", "Roll"])
+    monkeypatch.setattr(service, "_ocr_image", lambda image: next(texts))
+    
+    image = io.BytesIO()
+    Image.new("RGB", (40, 30), (255, 255, 255)).save(image, format="PNG")
+    
+    result = asyncio.run(service._extract_from_image(io.BytesIO(image.getvalue())))
+    
+    assert result["text"] == "Name: Rahul Kumar Roll No 123456 Subject Marks"
+
+def test_fast_mode_keeps_first_preprocessing_method_when_confident(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_FAST_MODE", True)
+    service = OCRService()
+    calls = []
+    text = "Name Rahul Kumar Roll No 123456 School Board Result Pass " * 2
+    
+    def fake_ocr(image):
+        calls.append(image)
+        return text
+    
+    monkeypatch.setattr(service, "_ocr_image", fake_ocr)
+    
+    image = io.BytesIO()
+    Image.new("RGB", (40, 30), (255, 255, 255)).save(image, format="PNG")
+    
+    result = asyncio.run(service._extract_from_image(io.BytesIO(image.getvalue())))
+    
+    assert result["text"] == text
+    assert len(calls) == 1
+
+def test_fast_mode_skips_fallback_psm_when_confident(monkeypatch):
+    monkeypatch.setattr(settings, "OCR_FAST_MODE", True)
+    service = OCRService()
+    modes = []
+    
+    def fake_recognize(image, psm):
+        modes.append(psm)
+        return ["Science", "78"], [90 if psm == 6 else 95, 90]
+    
+    monkeypatch.setattr(service, "_recognize_words", fake_recognize)
+    image = Image.new("L", (40, 30), 255)
+    
+    assert service._ocr_image(image) == "Science 78"
+    assert modes == [6]
+    
+    monkeypatch.setattr(settings, "OCR_FAST_MODE", False)
+    modes.clear()
+    service._ocr_image(image)
+    assert len(modes) == len(ocr.PSM_MODES)
+
+def test_ocr_confidence_counts_ascii_and_unicode_alike():
+    service = OCRService()
+    
+    ascii_score = service._calculate_ocr_confidence("Name: Rahul | Roll No: 42 ##")
+    unicode_score = service._calculate_ocr_confidence("Name: Rahul | Roll No: 42 #é")
+    
+    # 'é' is alphanumeric where '#' isn't: one more character of 28 counts
+    assert unicode_score - ascii_score == pytest.approx(30 / 28)
+    assert service._calculate_ocr_confidence("REMARKS and RESULT") == pytest.approx(18 / 100 * 40 + 30 + 10)
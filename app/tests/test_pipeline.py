@@ -0,0 +1,38 @@
+import asyncio
+from app.services.pipeline import run_pipeline
+
+def _run(items, **kwargs):
+    batches = []
+    
+    async def load(item):
+        if item == "bad":
+            raise ValueError("unreadable")
+        return item
+    
+    async def ocr(loaded):
+        await asyncio.sleep(0.01)
+        return loaded.upper()
+    
+    async def llm_batch(texts):
+        batches.append(list(texts))
+        return [f"result:{text}" for text in texts]
+    
+    results = asyncio.run(run_pipeline(items, load=load, ocr=ocr, llm_batch=llm_batch, **kwargs))
+    return results, batches
+
+def test_pipeline_preserves_order_and_batches_llm_calls():
+    results, batches = _run(["a", "b", "c", "d"], ocr_workers=4, max_batch_size=4, max_wait_time=0.2)
+    
+    assert results == ["result:A", "result:B", "result:C", "result:D"]
+    assert sorted(len(batch) for batch in batches) == [4]
+
+def test_pipeline_reports_item_errors_and_lookup_hits():
+    async def lookup(loaded):
+        return "cached" if loaded == "hit" else None
+    
+    results, batches = _run(["a", "bad", "hit"], lookup=lookup, max_wait_time=0.01)
+    
+    assert results[0] == "result:A"
+    assert isinstance(results[1], ValueError)
+    assert results[2] == "cached"
+    assert sum(len(batch) for batch in batches) == 1
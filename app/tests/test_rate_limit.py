@@ -0,0 +1,26 @@
+import asyncio
+import time
+from app.utils.rate_limit import AsyncRateLimiter
+
+def test_limiter_spaces_calls():
+    limiter = AsyncRateLimiter(rps=20)
+    
+    async def run():
+        async def call():
+            async with limiter:
+                return time.monotonic()
+        return await asyncio.gather(*[call() for _ in range(4)])
+    
+    starts = sorted(asyncio.run(run()))
+    
+    # Four calls at 20 rps need at least three 50ms gaps
+    assert starts[-1] - starts[0] >= 0.14
+
+def test_limiter_disabled_without_rate():
+    limiter = AsyncRateLimiter(rps=0)
+    
+    async def run():
+        async with limiter:
+            return True
+    
+    assert asyncio.run(run())
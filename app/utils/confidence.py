@@ -1,31 +1,62 @@
 import re
 from rapidfuzz import fuzz
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Optional, List, Tuple
 import numpy as np
-import asyncio
 from app.core.exceptions import MarksheetExtractionException
 
-async def calculate_confidence(
+# Field validation patterns
+_NAME_RE = re.compile(r'^[A-Za-z\s\-\.\']+$')
+_DATE_RE = re.compile(r'^\d{1,2}[-/]\d{1,2}[-/]\d{4}$')
+_ID_RE = re.compile(r'^[A-Za-z0-9\-\/]+$')
+_YEAR_RE = re.compile(r'^(19|20)\d{2}$')
+_BOARD_RE = re.compile(r'^[A-Za-z\s\&\-]+$')
+_INSTITUTION_RE = re.compile(r'^[A-Za-z\s\&\-\.]+$')
+_SUBJECT_RE = re.compile(r'^[A-Za-z0-9\s\(\)\-\&]+$')
+_GRADE_RE = re.compile(r'^[A-F][\+\-]?$|^First|Second|Third|Pass|Fail$')
+_DIVISION_RE = re.compile(r'^First|Second|Third|Distinction|Pass|Fail$')
+_PLACE_RE = re.compile(r'^[A-Za-z\s\-]+$')
+_DATE_SEPARATOR_RE = re.compile(r'[-/]')
+
+# Character sequences typical of OCR misreads (O for 0, l/I for 1, ...)
+_OCR_ERROR_PATTERNS = tuple(re.compile(pattern) for pattern in [
+    r'[0-9]+[oO][0-9]+',
+    r'[lI][0-9]+',
+    r'[0-9]+[lI]',
+    r'[A-Za-z]{2,}[0-9]{2,}',
+])
+
+def calculate_confidence_sync(
     field_name: str, 
-    field_value: str, 
+    field_value: Any, 
     ocr_result: Dict[str, Any],
     additional_data: Optional[Dict[str, Any]] = None
 ) -> float:
+    """
+    Score how likely an extracted field value is correct, between 0 and 1
+    """
     if not field_value:
         return 0.0
     
-    # Base confidence from field validation
-    validation_confidence = await _validate_field(field_name, field_value)
+    # Base confidence from field validation, on the value as typed by the LLM
+    validation_confidence = _validate_field(field_name, field_value)
+    
+    # Numbers, such as a percentage, are looked for in the text as written
+    text_value = field_value if isinstance(field_value, str) else str(field_value)
+    
+    # Both OCR and context scores look at where the value appears in the text
+    occurrences = _find_occurrences(ocr_result["text"], text_value)
     
     # Confidence from OCR quality
-    ocr_confidence = await _get_ocr_confidence(field_value, ocr_result)
+    ocr_confidence = _get_ocr_confidence(text_value, ocr_result, occurrences)
     
     # Confidence from context
-    context_confidence = await _get_context_confidence(
+    context_confidence = _get_context_confidence(
         field_name, 
-        field_value, 
+        text_value, 
         ocr_result["text"],
-        additional_data
+        occurrences,
+        additional_data,
+        ocr_result.get("text_lower")
     )
     
     # Combine confidences with weights
@@ -44,304 +75,268 @@ async def calculate_confidence(
     # Ensure confidence is between 0 and 1
     return max(0.0, min(1.0, combined_confidence))
 
-async def _validate_field(field_name: str, field_value: str) -> float:
-    if not field_value:
-        return 0.0
-    
-    # Field-specific validation
-    if field_name == "name":
-        if re.match(r'^[A-Za-z\s\-\.\']+$', field_value):
-            words = field_value.split()
-            if len(words) >= 2 and all(word[0].isupper() for word in words if word):
-                return 0.95
-            return 0.8
-        return 0.3
-    
-    elif field_name == "father_name":
-        return await _validate_field("name", field_value)
-    
-    elif field_name == "dob":
-        if re.match(r'^\d{1,2}[-/]\d{1,2}[-/]\d{4}$', field_value):
-            try:
-                parts = re.split(r'[-/]', field_value)
-                day, month, year = int(parts[0]), int(parts[1]), int(parts[2])
-                if 1 <= day <= 31 and 1 <= month <= 12 and 1900 <= year <= 2100:
-                    return 0.95
-            except (ValueError, IndexError):
-                pass
-        return 0.2
-    
-    elif field_name in ["roll_no", "registration_no"]:
-        if re.match(r'^[A-Za-z0-9\-\/]+$', field_value):
-            return 0.9
-        return 0.5
-    
-    elif field_name == "exam_year":
-        if re.match(r'^(19|20)\d{2}$', field_value):
-            year = int(field_value)
-            if 1980 <= year <= 2100:
+async def calculate_confidence(
+    field_name: str, 
+    field_value: str, 
+    ocr_result: Dict[str, Any],
+    additional_data: Optional[Dict[str, Any]] = None
+) -> float:
+    """
+    Coroutine form of calculate_confidence_sync
+    """
+    return calculate_confidence_sync(field_name, field_value, ocr_result, additional_data)
+
+def _validate_name(field_value: str) -> float:
+    if _NAME_RE.match(field_value):
+        words = field_value.split()
+        if len(words) >= 2 and all(word[0].isupper() for word in words if word):
+            return 0.95
+        return 0.8
+    return 0.3
+
+def _validate_date(field_value: str) -> float:
+    if _DATE_RE.match(field_value):
+        try:
+            parts = _DATE_SEPARATOR_RE.split(field_value)
+            day, month, year = int(parts[0]), int(parts[1]), int(parts[2])
+            if 1 <= day <= 31 and 1 <= month <= 12 and 1900 <= year <= 2100:
                 return 0.95
-        return 0.3
-    
-    elif field_name == "board":
-        if re.match(r'^[A-Za-z\s\&\-]+$', field_value) and field_value[0].isupper():
-            return 0.9
-        return 0.5
-    
-    elif field_name == "institution":
-        if re.match(r'^[A-Za-z\s\&\-\.]+$', field_value) and field_value[0].isupper():
-            return 0.9
-        return 0.5
-    
-    elif field_name == "subject":
-        if re.match(r'^[A-Za-z0-9\s\(\)\-\&]+$', field_value) and field_value[0].isupper():
+        except (ValueError, IndexError):
+            pass
+    return 0.2
+
+def _validate_id(field_value: str) -> float:
+    if _ID_RE.match(field_value):
+        return 0.9
+    return 0.5
+
+def _validate_exam_year(field_value: str) -> float:
+    if _YEAR_RE.match(field_value):
+        year = int(field_value)
+        if 1980 <= year <= 2100:
+            return 0.95
+    return 0.3
+
+def _validate_capitalized(pattern: re.Pattern) -> Callable[[str], float]:
+    """Validator for a proper-noun field that must match the given pattern"""
+    def validate(field_value: str) -> float:
+        if pattern.match(field_value) and field_value[0].isupper():
             return 0.9
         return 0.5
-    
-    elif field_name in ["max_marks", "obtained_marks"]:
+    return validate
+
+def _validate_marks(field_value: Any) -> float:
+    # Numbers from the LLM need no parsing
+    if isinstance(field_value, (int, float)):
+        marks = field_value
+    else:
         try:
             marks = float(field_value)
-            if 0 <= marks <= 1000:
-                return 0.95
-            return 0.7
         except (ValueError, TypeError):
             return 0.1
-    
-    elif field_name == "grade":
-        if re.match(r'^[A-F][\+\-]?$|^First|Second|Third|Pass|Fail$', field_value):
-            return 0.9
-        return 0.4
-    
-    elif field_name == "division":
-        if re.match(r'^First|Second|Third|Distinction|Pass|Fail$', field_value):
-            return 0.95
-        return 0.3
-    
-    elif field_name == "percentage":
+    if 0 <= marks <= 1000:
+        return 0.95
+    return 0.7
+
+def _validate_grade(field_value: str) -> float:
+    if _GRADE_RE.match(field_value):
+        return 0.9
+    return 0.4
+
+def _validate_division(field_value: str) -> float:
+    if _DIVISION_RE.match(field_value):
+        return 0.95
+    return 0.3
+
+def _validate_percentage(field_value: Any) -> float:
+    if isinstance(field_value, (int, float)):
+        percentage = field_value
+    else:
         try:
             percentage = float(field_value)
-            if 0 <= percentage <= 100:
-                return 0.95
-            return 0.5
         except (ValueError, TypeError):
             return 0.1
+    if 0 <= percentage <= 100:
+        return 0.95
+    return 0.5
+
+# Field-specific validation, by field name
+_FIELD_VALIDATORS: Dict[str, Callable[[str], float]] = {
+    "name": _validate_name,
+    "father_name": _validate_name,
+    "dob": _validate_date,
+    "roll_no": _validate_id,
+    "registration_no": _validate_id,
+    "exam_year": _validate_exam_year,
+    "board": _validate_capitalized(_BOARD_RE),
+    "institution": _validate_capitalized(_INSTITUTION_RE),
+    "subject": _validate_capitalized(_SUBJECT_RE),
+    "max_marks": _validate_marks,
+    "obtained_marks": _validate_marks,
+    "grade": _validate_grade,
+    "division": _validate_division,
+    "percentage": _validate_percentage,
+    "date": _validate_date,
+    "place": _validate_capitalized(_PLACE_RE),
+}
+
+def _validate_field(field_name: str, field_value: Any) -> float:
+    if not field_value:
+        return 0.0
     
-    elif field_name == "date":
-        if re.match(r'^\d{1,2}[-/]\d{1,2}[-/]\d{4}$', field_value):
-            try:
-                parts = re.split(r'[-/]', field_value)
-                day, month, year = int(parts[0]), int(parts[1]), int(parts[2])
-                if 1 <= day <= 31 and 1 <= month <= 12 and 1900 <= year <= 2100:
-                    return 0.95
-            except (ValueError, IndexError):
-                pass
-        return 0.2
-    
-    elif field_name == "place":
-        if re.match(r'^[A-Za-z\s\-]+$', field_value) and field_value[0].isupper():
-            return 0.9
-        return 0.5
-    
-    return 0.7
+    validator = _FIELD_VALIDATORS.get(field_name)
+    if validator is None:
+        return 0.7
+    return validator(field_value)
 
-async def _get_ocr_confidence(field_value: str, ocr_result: Dict[str, Any]) -> float:
+def _find_occurrences(text: str, field_value: str) -> List[int]:
+    occurrences = []
+    pos = text.find(field_value)
+    while pos != -1:
+        occurrences.append(pos)
+        pos = text.find(field_value, pos + 1)
+    return occurrences
+
+def _get_ocr_confidence(field_value: str, ocr_result: Dict[str, Any], occurrences: List[int]) -> float:
     text = ocr_result["text"]
     
-    if field_value not in text:
+    if not occurrences:
         return 0.5
     
-    ocr_error_indicators = [
-        r'[0-9]+[oO][0-9]+',
-        r'[lI][0-9]+',
-        r'[0-9]+[lI]',
-        r'[A-Za-z]{2,}[0-9]{2,}',
-    ]
-    
-    for pattern in ocr_error_indicators:
-        if re.search(pattern, field_value):
+    for pattern in _OCR_ERROR_PATTERNS:
+        if pattern.search(field_value):
             return 0.6
     
-    occurrences = []
-    start = 0
-    while True:
-        pos = text.find(field_value, start)
-        if pos == -1:
-            break
-        occurrences.append(pos)
-        start = pos + 1
+    window_size = 50
+    max_similarity = 0.0
     
-    if occurrences:
-        window_size = 50
-        max_similarity = 0.0
-        
-        for pos in occurrences:
-            start_pos = max(0, pos - window_size)
-            end_pos = min(len(text), pos + len(field_value) + window_size)
-            context = text[start_pos:end_pos]
-            
-            similarity = fuzz.token_sort_ratio(field_value, context) / 100.0
-            max_similarity = max(max_similarity, similarity)
+    for pos in occurrences:
+        start_pos = max(0, pos - window_size)
+        end_pos = min(len(text), pos + len(field_value) + window_size)
+        context = text[start_pos:end_pos]
         
+        # Similarities of 50 or less all score the same, so rapidfuzz can
+        # give up early on them; a value is usually much shorter than its window
+        similarity = fuzz.token_sort_ratio(field_value, context, score_cutoff=50) / 100.0
+        max_similarity = max(max_similarity, similarity)
         if max_similarity > 0.9:
-            return 0.9
-        elif max_similarity > 0.7:
-            return 0.8
-        elif max_similarity > 0.5:
-            return 0.7
+            break
+    
+    if max_similarity > 0.9:
+        return 0.9
+    elif max_similarity > 0.7:
+        return 0.8
+    elif max_similarity > 0.5:
+        return 0.7
     
     return 0.85
 
-async def _get_context_confidence(
+# Words near a value that suggest it was read from the right field
+_FIELD_INDICATORS: Dict[str, Tuple[str, ...]] = {
+    "name": ("name", "candidate", "student", "name of"),
+    "father_name": ("father", "mother", "parent", "guardian", "s/o", "d/o"),
+    "dob": ("birth", "dob", "date of birth", "born"),
+    "roll_no": ("roll", "roll no", "roll number", "roll no."),
+    "registration_no": ("reg", "registration", "reg no", "reg. no"),
+    "exam_year": ("year", "exam year", "year of", "academic year"),
+    "board": ("board", "university", "council", "authority"),
+    "institution": ("school", "college", "institution", "academy", "vidyalaya"),
+    "subject": ("subject", "paper", "course", "discipline"),
+    "max_marks": ("max", "maximum", "total", "out of"),
+    "obtained_marks": ("obtained", "scored", "secured", "marks"),
+    "grade": ("grade", "grading", "result"),
+    "division": ("division", "class", "distinction", "category"),
+    "percentage": ("percentage", "percent", "%", "aggregate"),
+    "date": ("date", "issue date", "dated", "date of issue"),
+    "place": ("place", "issued at", "place of issue", "location")
+}
+
+# Words near a value that strongly suggest its field
+_FIELD_STRONG_INDICATORS: Dict[str, Tuple[str, ...]] = {
+    "name": ("candidate", "student", "name of", "s/o", "d/o", "son of", "daughter of"),
+    "father_name": ("father", "mother", "parent", "guardian", "s/o", "d/o"),
+    "dob": ("birth", "dob", "date of birth", "born"),
+    "roll_no": ("roll", "roll no", "roll number", "roll no."),
+    "registration_no": ("reg", "registration", "reg no", "reg. no"),
+    "exam_year": ("year", "exam year", "year of", "academic year"),
+    "board": ("board", "university", "council", "authority"),
+    "institution": ("school", "college", "institution", "academy", "vidyalaya"),
+    "subject": ("subject", "paper", "course", "discipline"),
+    "max_marks": ("marks", "score", "points", "maximum", "obtained", "secured"),
+    "obtained_marks": ("marks", "score", "points", "maximum", "obtained", "secured"),
+    "grade": ("grade", "grading", "result"),
+    "division": ("division", "class", "distinction", "category"),
+    "percentage": ("percentage", "percent", "%", "aggregate"),
+    "date": ("date", "issue date", "dated", "date of issue"),
+    "place": ("place", "issued at", "place of issue", "location")
+}
+
+# Subjects expected on the marksheet
+_EXPECTED_SUBJECTS = ("language", "science", "india & people", "additional")
+
+def _get_context_confidence(
     field_name: str, 
     field_value: str, 
     ocr_text: str,
-    additional_data: Optional[Dict[str, Any]] = None
+    occurrences: List[int],
+    additional_data: Optional[Dict[str, Any]] = None,
+    ocr_text_lower: Optional[str] = None
 ) -> float:
-    occurrences = []
-    start = 0
-    while True:
-        pos = ocr_text.find(field_value, start)
-        if pos == -1:
-            break
-        occurrences.append(pos)
-        start = pos + 1
-    
     if not occurrences:
         return 0.3
     
+    indicators = _FIELD_INDICATORS.get(field_name, ())
+    strong_indicators = _FIELD_STRONG_INDICATORS.get(field_name, ())
+    
+    # The subject checks only depend on the value, not where it appears
+    subject_score = 0.0
+    if field_name == "subject":
+        subject = field_value.lower()
+        # Check if it's one of the expected subjects
+        if subject in _EXPECTED_SUBJECTS:
+            subject_score = 0.95
+        
+        # Check if the marks are in expected ranges
+        if additional_data and 'obtained_marks' in additional_data:
+            marks = additional_data['obtained_marks']
+            if marks:
+                if subject == "language" and 150 <= marks <= 160:
+                    subject_score = 0.95
+                elif subject == "science" and 210 <= marks <= 220:
+                    subject_score = 0.95
+                elif "india" in subject and 110 <= marks <= 120:
+                    subject_score = 0.95
+                elif subject == "additional" and 30 <= marks <= 40:
+                    subject_score = 0.95
+    
+    # Highest score any occurrence can get; once one reaches it the rest can be skipped
+    best_possible = max(0.9, subject_score)
+    
     context_scores = []
     window_size = 150
     
     for pos in occurrences:
         start_pos = max(0, pos - window_size)
         end_pos = min(len(ocr_text), pos + len(field_value) + window_size)
-        context = ocr_text[start_pos:end_pos].lower()
-        
-        indicators = _get_field_indicators(field_name)
-        
-        score = 0.0
-        for indicator in indicators:
-            if indicator in context:
-                score = max(score, 0.8)
-        
-        if field_name == "name" and any(term in context for term in [
-            'candidate', 'student', 'name of', 's/o', 'd/o', 'son of', 'daughter of'
-        ]):
-            score = max(score, 0.9)
-        
-        elif field_name == "father_name" and any(term in context for term in [
-            'father', 'mother', 'parent', 'guardian', 's/o', 'd/o'
-        ]):
-            score = max(score, 0.9)
-        
-        elif field_name == "dob" and any(term in context for term in [
-            'birth', 'dob', 'date of birth', 'born'
-        ]):
-            score = max(score, 0.9)
-        
-        elif field_name == "roll_no" and any(term in context for term in [
-            'roll', 'roll no', 'roll number', 'roll no.'
-        ]):
-            score = max(score, 0.9)
+        if ocr_text_lower is not None:
+            context = ocr_text_lower[start_pos:end_pos]
+        else:
+            context = ocr_text[start_pos:end_pos].lower()
         
-        elif field_name == "registration_no" and any(term in context for term in [
-            'reg', 'registration', 'reg no', 'reg. no'
-        ]):
-            score = max(score, 0.9)
+        if any(indicator in context for indicator in strong_indicators):
+            score = 0.9
+        elif any(indicator in context for indicator in indicators):
+            score = 0.8
+        else:
+            score = 0.0
         
-        elif field_name == "exam_year" and any(term in context for term in [
-            'year', 'exam year', 'year of', 'academic year'
-        ]):
-            score = max(score, 0.9)
-        
-        elif field_name == "board" and any(term in context for term in [
-            'board', 'university', 'council', 'authority'
-        ]):
-            score = max(score, 0.9)
-        
-        elif field_name == "institution" and any(term in context for term in [
-            'school', 'college', 'institution', 'academy', 'vidyalaya'
-        ]):
-            score = max(score, 0.9)
-        
-        elif field_name == "subject":
-            # Check if it's one of the expected subjects
-            expected_subjects = ["language", "science", "india & people", "additional"]
-            if field_value.lower() in expected_subjects:
-                score = max(score, 0.95)
-            elif any(term in context for term in [
-                'subject', 'paper', 'course', 'discipline'
-            ]):
-                score = max(score, 0.9)
-            
-            # Check if the marks are in expected ranges
-            if additional_data and 'obtained_marks' in additional_data:
-                marks = additional_data['obtained_marks']
-                if marks:
-                    if field_value.lower() == "language" and 150 <= marks <= 160:
-                        score = max(score, 0.95)
-                    elif field_value.lower() == "science" and 210 <= marks <= 220:
-                        score = max(score, 0.95)
-                    elif "india" in field_value.lower() and 110 <= marks <= 120:
-                        score = max(score, 0.95)
-                    elif field_value.lower() == "additional" and 30 <= marks <= 40:
-                        score = max(score, 0.95)
-        
-        elif field_name in ["max_marks", "obtained_marks"] and any(term in context for term in [
-            'marks', 'score', 'points', 'maximum', 'obtained', 'secured'
-        ]):
-            score = max(score, 0.9)
-        
-        elif field_name == "grade" and any(term in context for term in [
-            'grade', 'grading', 'result'
-        ]):
-            score = max(score, 0.9)
-        
-        elif field_name == "division" and any(term in context for term in [
-            'division', 'class', 'distinction', 'category'
-        ]):
-            score = max(score, 0.9)
-        
-        elif field_name == "percentage" and any(term in context for term in [
-            'percentage', 'percent', '%', 'aggregate'
-        ]):
-            score = max(score, 0.9)
-        
-        elif field_name == "date" and any(term in context for term in [
-            'date', 'issue date', 'dated', 'date of issue'
-        ]):
-            score = max(score, 0.9)
-        
-        elif field_name == "place" and any(term in context for term in [
-            'place', 'issued at', 'place of issue', 'location'
-        ]):
-            score = max(score, 0.9)
+        score = max(score, subject_score)
         
         if score == 0.0:
             score = 0.5
         
         context_scores.append(score)
+        if score >= best_possible:
+            break
     
     return max(context_scores)
-
-def _get_field_indicators(field_name: str) -> List[str]:
-    indicators = {
-        "name": ["name", "candidate", "student", "name of"],
-        "father_name": ["father", "mother", "parent", "guardian", "s/o", "d/o"],
-        "dob": ["birth", "dob", "date of birth", "born"],
-        "roll_no": ["roll", "roll no", "roll number", "roll no."],
-        "registration_no": ["reg", "registration", "reg no", "reg. no"],
-        "exam_year": ["year", "exam year", "year of", "academic year"],
-        "board": ["board", "university", "council", "authority"],
-        "institution": ["school", "college", "institution", "academy", "vidyalaya"],
-        "subject": ["subject", "paper", "course", "discipline"],
-        "max_marks": ["max", "maximum", "total", "out of"],
-        "obtained_marks": ["obtained", "scored", "secured", "marks"],
-        "grade": ["grade", "grading", "result"],
-        "division": ["division", "class", "distinction", "category"],
-        "percentage": ["percentage", "percent", "%", "aggregate"],
-        "date": ["date", "issue date", "dated", "date of issue"],
-        "place": ["place", "issued at", "place of issue", "location"]
-    }
-    
-    return indicators.get(field_name, [])
\ No newline at end of file
@@ -1,10 +1,46 @@
 import os
-import uuid
-from typing import List
+import time
+import aiofiles
+import aiofiles.tempfile
+from typing import Any, List, Optional
 from fastapi import UploadFile, HTTPException
 from app.core.config import settings
 from app.core.exceptions import MarksheetExtractionException
 
+# Read uploads in 1 MiB chunks, matching Starlette's spooled file granularity
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Leading bytes identifying each supported file type
+FILE_SIGNATURES = {
+    b"%PDF": "application/pdf",
+    b"\x89PNG": "image/png",
+    b"\xff\xd8\xff": "image/jpeg",
+}
+SIGNATURE_LENGTH = 12
+
+# Prefix of every temp file we create, so stragglers can be found and removed
+TEMP_FILE_PREFIX = "marksheet_"
+
+# Temp file extension for each supported type; the OCR service dispatches on it
+FILE_EXTENSIONS = {
+    "application/pdf": ".pdf",
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+}
+
+# TEMP_DIR as last created, so it's only created once per process
+_created_temp_dir: Optional[str] = None
+
+def ensure_temp_dir() -> None:
+    """
+    Create the temp directory if it hasn't been created yet in this process
+    """
+    global _created_temp_dir
+    if _created_temp_dir != settings.TEMP_DIR:
+        os.makedirs(settings.TEMP_DIR, exist_ok=True)
+        _created_temp_dir = settings.TEMP_DIR
+
 def validate_file(file: UploadFile) -> None:
     """
     Validate uploaded file
@@ -15,8 +51,8 @@ def validate_file(file: UploadFile) -> None:
     Raises:
         MarksheetExtractionException: If file is invalid
     """
-    # Check file size
-    if file.size > settings.MAX_FILE_SIZE:
+    # Cheap pre-check; the limit is enforced again on the bytes actually read
+    if file.size is not None and file.size > settings.MAX_FILE_SIZE:
         raise MarksheetExtractionException(
             status_code=413,
             detail=f"File size exceeds maximum limit of {settings.MAX_FILE_SIZE / (1024 * 1024)} MB"
@@ -29,22 +65,149 @@ def validate_file(file: UploadFile) -> None:
             detail=f"Unsupported file type: {file.content_type}. Allowed types: {', '.join(settings.ALLOWED_FILE_TYPES)}"
         )
 
-def get_temp_file_path(filename: str) -> str:
+def detect_file_type(header: bytes) -> Optional[str]:
     """
-    Generate a temporary file path
+    Detect a file's type from its leading bytes
+    
+    Args:
+        header: First bytes of the file
+        
+    Returns:
+        Optional[str]: MIME type, or None if the signature is not recognized
+    """
+    for signature, content_type in FILE_SIGNATURES.items():
+        if header.startswith(signature):
+            return content_type
+    
+    # WebP is a RIFF container: "RIFF" <4-byte size> "WEBP"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    
+    return None
+
+async def validate_file_signature(file: UploadFile) -> None:
+    """
+    Check that an upload's content matches its declared type
+    
+    Only the first few bytes are read, so bad uploads are rejected before
+    the body is buffered or handed to the extractor.
+    
+    Args:
+        file: Uploaded file
+        
+    Raises:
+        MarksheetExtractionException: If the content doesn't match the declared type
+    """
+    header = await file.read(SIGNATURE_LENGTH)
+    await file.seek(0)
+    
+    detected_type = detect_file_type(header)
+    if detected_type != file.content_type:
+        raise MarksheetExtractionException(
+            status_code=415,
+            detail=f"File content does not match declared type: {file.content_type}"
+        )
+
+def temp_upload_file(content_type: str) -> Any:
+    """
+    Create a temporary file for an upload, deleted when its context exits
+    
+    The name is derived from the validated content type rather than the
+    client-supplied filename.
     
     Args:
-        filename: Original filename
+        content_type: Validated MIME type of the upload
         
     Returns:
-        str: Temporary file path
+        Async context manager yielding the open temp file
     """
-    # Create temp directory if it doesn't exist
-    os.makedirs(settings.TEMP_DIR, exist_ok=True)
+    # Create temp directory if it doesn't exist; normally done at startup
+    ensure_temp_dir()
     
-    # Generate unique filename
-    file_extension = os.path.splitext(filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
+    return aiofiles.tempfile.NamedTemporaryFile(
+        mode="wb",
+        dir=settings.TEMP_DIR,
+        prefix=TEMP_FILE_PREFIX,
+        suffix=FILE_EXTENSIONS.get(content_type, ""),
+        delete=True
+    )
+
+def cleanup_stale_temp_files(max_age: float) -> int:
+    """
+    Remove temp files left behind by workers that died before cleaning up
+    
+    Args:
+        max_age: Minimum age in seconds of the files to remove
+        
+    Returns:
+        int: Number of files removed
+    """
+    if not os.path.isdir(settings.TEMP_DIR):
+        return 0
+    
+    cutoff = time.time() - max_age
+    removed = 0
+    with os.scandir(settings.TEMP_DIR) as entries:
+        for entry in entries:
+            if not entry.name.startswith(TEMP_FILE_PREFIX) or not entry.is_file(follow_symlinks=False):
+                continue
+            try:
+                if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                # Another worker may have removed it already
+                pass
+    
+    return removed
+
+async def read_upload_file(file: UploadFile) -> bytes:
+    """
+    Read an uploaded file into memory, enforcing the size limit as it streams
+    
+    Args:
+        file: Uploaded file
+        
+    Returns:
+        bytes: File contents
+        
+    Raises:
+        MarksheetExtractionException: If the file exceeds the size limit
+    """
+    buffer = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        buffer += chunk
+        if len(buffer) > settings.MAX_FILE_SIZE:
+            raise MarksheetExtractionException(
+                status_code=413,
+                detail=f"File size exceeds maximum limit of {settings.MAX_FILE_SIZE / (1024 * 1024)} MB"
+            )
+    
+    return bytes(buffer)
+
+async def write_upload_file(file: UploadFile, out: Any) -> int:
+    """
+    Stream an uploaded file into an open async file without blocking the event loop
+    
+    Args:
+        file: Uploaded file
+        out: Async file opened for binary writing
+        
+    Returns:
+        int: Number of bytes written
+        
+    Raises:
+        MarksheetExtractionException: If the file exceeds the size limit
+    """
+    total = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        total += len(chunk)
+        if total > settings.MAX_FILE_SIZE:
+            raise MarksheetExtractionException(
+                status_code=413,
+                detail=f"File size exceeds maximum limit of {settings.MAX_FILE_SIZE / (1024 * 1024)} MB"
+            )
+        await out.write(chunk)
     
-    # Return full path
-    return os.path.join(settings.TEMP_DIR, unique_filename)
\ No newline at end of file
+    await out.flush()
+    return total
@@ -0,0 +1,32 @@
+import asyncio
+import time
+from typing import Optional
+
+class AsyncRateLimiter:
+    """
+    Spaces calls so that at most `rps` of them start per second
+    """
+    def __init__(self, rps: float):
+        self.interval = 1.0 / rps if rps > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+    
+    async def __aenter__(self) -> "AsyncRateLimiter":
+        if self.interval <= 0:
+            return self
+        
+        # Created lazily so the lock binds to the running event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None